@@ -0,0 +1 @@
+# benchmarks for the hot paths of the triage system (see run_benchmarks.py)
@@ -0,0 +1,84 @@
+# checks the dashboard start-up import cost.
+#
+#   python -m benchmarks.import_time
+#   python -m benchmarks.import_time --budget 0.15 --repeat 5
+#
+# main.py is imported in a fresh interpreter (python -X importtime) a few times and the
+# best cumulative time is compared against --budget (seconds). It also fails when one of
+# the lazily loaded modules (matplotlib, numpy, the models, the render pool...) was pulled
+# in by the import. Exits with status 1 on either problem, so it can gate CI.
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_BUDGET = 0.25  # seconds for "import main"
+DEFAULT_MODULE = "main"
+
+# must not be imported before the user asks for a chart, a clustering or an admission
+LAZY_MODULES = [
+    "matplotlib",
+    "numpy",
+    "src.statistics_visuals",
+    "src.visualize_clusters",
+    "src.render_queue",
+    "src.kmeans",
+    "src.nb_priority",
+    "src.regression",
+    "src.triage_logic",
+    "src.console_admit",
+    "src.bulk_admit",
+]
+
+_PROBE = "import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"
+
+
+def measure(module=DEFAULT_MODULE):
+    """Import module in a new interpreter; returns (seconds, loaded module names)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    seconds = None
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            seconds = int(parts[1]) / 1e6
+    return seconds, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the dashboard import-time budget.")
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    best, loaded = None, set()
+    for _ in range(args.repeat):
+        seconds, modules = measure(args.module)
+        loaded.update(modules)
+        if seconds is not None and (best is None or seconds < best):
+            best = seconds
+
+    ok = True
+    eager = [m for m in LAZY_MODULES if m in loaded]
+    if eager:
+        ok = False
+        print(f"[FAIL] imported eagerly by {args.module}: {', '.join(eager)}")
+    if best is None:
+        ok = False
+        print(f"[FAIL] no import time reported for {args.module}")
+    elif best > args.budget:
+        ok = False
+        print(f"[FAIL] import {args.module}: {best * 1000:.1f} ms > budget {args.budget * 1000:.0f} ms")
+    else:
+        print(f"[OK] import {args.module}: {best * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# runs the hot-path benchmarks on synthetic data and writes the timings as JSON.
+#
+#   python -m benchmarks.run_benchmarks --sizes 1000 10000 100000 --out bench.json
+#   python -m benchmarks.run_benchmarks --sizes 1000 --compare bench.json
+#
+# --compare exits with status 1 when a benchmark got slower than --threshold (ratio).
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+
+from benchmarks.synthetic import write_csv
+from src.admissions_io import load_csv, clean_dataset, preprocess_dataset
+from src.triage_logic import assign_priority, assign_priority_batch
+from src.nb_priority import nb_train, nb_predict, nb_predict_many
+from src.regression import fit_linear_regression
+from src.kmeans import kmeans, kmeans_fit
+from src.queue_manager import sort_by_priority
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+REGRESSION_FEATURES = ["Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level"]
+NB_PREDICT_ROWS = 10000  # nb_predict is timed on at most this many patients
+
+
+class Context:
+    """Data for one dataset size, built on first use and shared by the benchmarks."""
+
+    def __init__(self, rows, seed, workdir):
+        self.rows = rows
+        self.seed = seed
+        self.workdir = workdir
+        self._cache = {}
+
+    def _get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def path(self):
+        return self._get("path", lambda: write_csv(
+            os.path.join(self.workdir, f"patients_{self.rows}.csv"), self.rows, self.seed))
+
+    @property
+    def raw(self):
+        return self._get("raw", lambda: _quiet(load_csv, self.path))
+
+    @property
+    def cleaned(self):
+        return self._get("cleaned", lambda: clean_dataset(self.raw))
+
+    @property
+    def prepped(self):
+        return self._get("prepped", lambda: preprocess_dataset(clean_dataset(self.raw)))
+
+    @property
+    def points(self):
+        return self._get("points", lambda: [(float(p["Heart_Rate"]), float(p["Oxygen_Level"])) for p in self.cleaned])
+
+
+def _quiet(fn, *args):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return fn(*args)
+
+
+def _compute_statistics(patients):
+    from src.statistics_visuals import compute_statistics
+    return compute_statistics(patients)
+
+
+# name -> (setup(ctx) -> args, function, largest size it is run at)
+BENCHMARKS = {
+    "load_csv": (lambda c: (c.path,), lambda path: _quiet(load_csv, path), None),
+    "clean_dataset": (lambda c: (c.raw,), clean_dataset, None),
+    "preprocess_dataset": (lambda c: (clean_dataset(c.raw),), preprocess_dataset, None),
+    "assign_priority": (lambda c: (c.cleaned,), lambda ps: [assign_priority(p) for p in ps], None),
+    "assign_priority_batch": (lambda c: (c.cleaned,), assign_priority_batch, None),
+    "nb_train": (lambda c: (c.prepped,), nb_train, None),
+    "nb_predict": (lambda c: (nb_train(c.prepped), c.prepped[:NB_PREDICT_ROWS]),
+                   lambda m, ps: [nb_predict(m, p) for p in ps], None),
+    "nb_predict_many": (lambda c: (nb_train(c.prepped), c.prepped), nb_predict_many, None),
+    "nb_train_binned": (lambda c: (c.prepped,), lambda ps: nb_train(ps, mode="binned"), None),
+    "nb_predict_binned": (lambda c: (nb_train(c.prepped, mode="binned"), c.prepped[:NB_PREDICT_ROWS]),
+                          lambda m, ps: [nb_predict(m, p) for p in ps], None),
+    "fit_linear_regression": (lambda c: (c.prepped, REGRESSION_FEATURES), fit_linear_regression, None),
+    "kmeans": (lambda c: (c.points,), lambda pts: kmeans(pts, k=3), 200000),
+    "kmeans_fit": (lambda c: (c.points,), lambda pts: kmeans_fit(pts, k=3, n_init=1, seed=0), None),
+    "sort_by_priority": (lambda c: (c.prepped,), lambda ps: sort_by_priority(list(ps)), 5000),
+    "compute_statistics": (lambda c: (c.prepped,), _compute_statistics, None),
+}
+
+# benchmarks that only time part of the dataset -> how many rows they time at most
+TIMED_ROWS = {"nb_predict": NB_PREDICT_ROWS, "nb_predict_binned": NB_PREDICT_ROWS}
+
+
+def time_call(fn, setup, repeat):
+    """Best wall time over `repeat` runs; setup runs before each one and is not timed."""
+    best = None
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes, names=None, repeat=3, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            ctx = Context(rows, seed, workdir)
+            for name, (setup, fn, max_rows) in BENCHMARKS.items():
+                if names and name not in names:
+                    continue
+                entry = {"name": name, "rows": rows}
+                if max_rows is not None and rows > max_rows:
+                    entry["skipped"] = f"only run up to {max_rows} rows"
+                else:
+                    try:
+                        seconds = time_call(fn, lambda: setup(ctx), repeat)
+                        timed_rows = min(rows, TIMED_ROWS.get(name, rows))
+                        entry.update(seconds=seconds, timed_rows=timed_rows,
+                                     rows_per_sec=timed_rows / seconds if seconds else None)
+                    except ImportError as e:
+                        entry["skipped"] = f"missing dependency: {e.name}"
+                results.append(entry)
+                print(_format(entry), flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _format(entry):
+    if "skipped" in entry:
+        return f"{entry['name']:<24} {entry['rows']:>10}  skipped ({entry['skipped']})"
+    return f"{entry['name']:<24} {entry['rows']:>10}  {entry['seconds'] * 1000:10.2f} ms"
+
+
+def compare(baseline, current, threshold=1.25):
+    """List of (name, rows, old, new) where the new time is more than threshold x the old one."""
+    old = {(r["name"], r["rows"]): r.get("seconds") for r in baseline["results"]}
+    slower = []
+    for r in current["results"]:
+        before = old.get((r["name"], r["rows"]))
+        now = r.get("seconds")
+        if before and now and now > before * threshold:
+            slower.append((r["name"], r["rows"], before, now))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the triage system hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.only, args.repeat, args.seed)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[SAVE] Benchmark results → {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(json.load(f), report, args.threshold)
+        for name, rows, before, now in slower:
+            print(f"[SLOWER] {name} @ {rows} rows: {before * 1000:.2f} ms → {now * 1000:.2f} ms")
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# seeded generator of synthetic patients, shaped like dataset/patients.csv
+# (realistic vitals, injury / consciousness mix, and some dirty values on purpose)
+import csv
+import random
+
+from src.admissions_io import ORIGINAL_FIELDS
+
+FIRST_NAMES = [
+    "Sarah", "Ali", "Leila", "Rami", "Maya", "Omar", "Nour", "Karim", "Lina", "Hadi",
+    "Yara", "Sami", "Rana", "Fadi", "Dana", "Ziad", "Hiba", "Tarek", "Jana", "Walid",
+]
+INJURIES = [("Minor", 30), ("Bleeding", 20), ("Fracture", 20), ("Burn", 15), ("None", 15)]
+DIRTY_VALUES = ["nan", "-", "", "unknown", "_", "n/a"]
+
+
+def _clip(x, lo, hi):
+    return max(lo, min(hi, x))
+
+
+def generate_patient(rng, dirty_rate=0.02):
+    """One raw patient row (strings, like a CSV line)."""
+    unconscious = rng.random() < 0.15
+    critical = unconscious or rng.random() < 0.1
+
+    age = _clip(int(rng.gauss(42, 20)), 1, 98)
+    hr = _clip(rng.gauss(125 if critical else 88, 18), 30, 200)
+    bp = _clip(rng.gauss(85 if critical else 118, 15), 40, 200)
+    o2 = _clip(rng.gauss(86 if critical else 96, 3), 60, 100)
+    injury = rng.choices([i for i, _ in INJURIES], weights=[w for _, w in INJURIES])[0]
+    recovery = 0.0 if rng.random() < 0.2 else round(_clip(rng.gauss(40 if critical else 25, 12), 1, 120), 1)
+
+    row = {
+        "Name": rng.choice(FIRST_NAMES).lower() if rng.random() < 0.05 else rng.choice(FIRST_NAMES),
+        "Age": f"{age:.1f}",
+        "Heart_Rate": f"{hr:.1f}",
+        "Consciousness": "Unconscious" if unconscious else "Conscious",
+        "Injury_Type": injury,
+        "Blood_Pressure": f"{bp:.1f}",
+        "Oxygen_Level": f"{o2:.1f}",
+        "Recovery_Time": f"{recovery:.1f}",
+    }
+    # dirty values like the ones clean_record has to deal with
+    for field in ORIGINAL_FIELDS[1:]:
+        if rng.random() < dirty_rate:
+            row[field] = rng.choice(DIRTY_VALUES)
+    return row
+
+
+def iter_patients(n, seed=0, dirty_rate=0.02):
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield generate_patient(rng, dirty_rate)
+
+
+def generate_patients(n, seed=0, dirty_rate=0.02):
+    return list(iter_patients(n, seed, dirty_rate))
+
+
+def write_csv(path, n, seed=0, dirty_rate=0.02):
+    """Stream n synthetic rows to a CSV file (works for 10M rows without holding them)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=ORIGINAL_FIELDS)
+        writer.writeheader()
+        writer.writerows(iter_patients(n, seed, dirty_rate))
+    return path
@@ -1,17 +1,15 @@
 import os
-from src.admissions_io import load_csv, clean_dataset, preprocess_dataset, MAIN_DATASET, save_csv
-from src.console_admit import run_admission_session
-from src.triage_logic import assign_priority
-from src.nb_priority import nb_train, nb_predict
-from src.queue_manager import sort_by_priority
-from src.kmeans import kmeans
-from src.visualize_clusters import plot_clusters
-from src.statistics_visuals import (
-    compute_statistics,
-    plot_priority_distribution,
-    plot_injury_distribution,
-    plot_consciousness_distribution,
-)
+from src.admissions_io import load_preprocessed, MAIN_DATASET
+from src.admission_journal import AdmissionJournal, replay_journal, compact, compact_in_background, COMPACT_THRESHOLD
+from src.queue_manager import TriageQueue
+from src.stats_aggregator import StatsAggregator
+from src.patient_index import PatientIndex
+from src.pagination import page_list, priority_key
+from src import instrumentation
+
+# plotting, clustering and the ML models are imported on first use (see build_models,
+# start_render_queue and the menu branches) so the menu shows up right after the data load.
+# benchmarks/import_time.py checks that this stays that way.
 
 
 def clear_console():
@@ -42,12 +40,8 @@ def show_patients_table(patients, limit=20):
         print(f"... ({len(patients) - limit} more)")
 
 
-def filter_by_injury_menu(patients):
-    counts = {}
-    for p in patients:
-        key = str(p.get("Injury_Type", "Unknown")).capitalize()
-        counts[key] = counts.get(key, 0) + 1
-    options = sorted(counts.items(), key=lambda kv: kv[0])
+def filter_by_injury_menu(patients, index):
+    options = sorted(index.counts("Injury_Type").items(), key=lambda kv: kv[0])
     print("\nAvailable injury types:")
     for i, (k, v) in enumerate(options, start=1):
         print(f"{i}. {k} ({v})")
@@ -59,18 +53,81 @@ def filter_by_injury_menu(patients):
     try:
         idx = int(choice) - 1
         if 0 <= idx < len(options):
-            wanted = options[idx][0]
-            return [p for p in patients if str(p.get("Injury_Type", "")).capitalize() == wanted]
+            return index.query(injury=options[idx][0])
     except:
         pass
     return patients
 
 
+def browse(title, get_page, total):
+    """Show one page at a time; get_page(after, before) returns a pagination.Page."""
+    page = get_page(None, None)
+    while True:
+        print(f"\n{title} ({total} patients)")
+        show_patients_table(page.patients(), limit=len(page.items))
+        options = []
+        if page.has_prev:
+            options.append("p) previous page")
+        if page.has_next:
+            options.append("n) next page")
+        options.append("Enter) back")
+        nav = input("  ".join(options) + ": ").strip().lower()
+        if nav == "n" and page.has_next:
+            page = get_page(page.last, None)
+        elif nav == "p" and page.has_prev:
+            page = get_page(None, page.first)
+        elif nav == "":
+            return
+
+
+def queue_chart(charts, kind, *args, key=None):
+    # charts render in the background, the menu does not wait for them
+    if charts.submit(kind, *args, key=key) is None:
+        print(f"{kind} is already up to date.")
+    else:
+        print(f"{kind} queued, it will be saved in the report folder.")
+
+
+def build_models(patients):
+    """
+    NB priority model and recovery regression, needed the first time a patient is admitted.
+    They come from dataset/models.json when it was saved for exactly these patients.
+    Returns (model_cache, nb_model, recovery_model).
+    """
+    from src.model_cache import ModelCache
+
+    cache = ModelCache()
+    return (cache,) + cache.load_or_train(patients)
+
+
+def start_render_queue():
+    from src.render_queue import RenderQueue
+    return RenderQueue()
+
+
+def dump_metrics():
+    from src.render_queue import REPORT_DIR
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    json_path = os.path.join(REPORT_DIR, "metrics.json")
+    prom_path = os.path.join(REPORT_DIR, "metrics.prom")
+    instrumentation.dump_json(json_path)
+    instrumentation.dump_prometheus(prom_path)
+    print(f"Metrics written to {json_path} and {prom_path}")
+
+
 def main():
     
-    raw = load_csv(MAIN_DATASET)
-    patients = clean_dataset(raw)
-    patients = preprocess_dataset(patients)
+    patients = load_preprocessed(MAIN_DATASET)
+    # admissions journaled since the last compaction
+    patients.extend(replay_journal())
+    journal = AdmissionJournal()
+    compactor = None
+    charts = None
+    queue = TriageQueue(patients)
+    model_cache = nb_model = recovery_model = None
+    stats = StatsAggregator.from_patients(patients)
+    index = PatientIndex(patients)
 
     while True:
         clear_console()
@@ -83,6 +140,8 @@ def main():
         print("4) View patients sorted by PRIORITY")
         print("5) View patients filtered by INJURY TYPE")
         print("6) View K-Means CLUSTERS (HR vs O₂)")
+        print("7) Bulk admission from an intake file (CSV / JSONL)")
+        print("8) Dump timing metrics (set TRIAGE_METRICS=1 to record them)")
         print("0) Exit")
         print("=" * 70)
 
@@ -90,25 +149,43 @@ def main():
 
         
         if choice == "1":
-            new_patients = run_admission_session(assign_priority, nb_train, nb_predict, patients)
+            from src.console_admit import run_admission_session
+            from src.triage_logic import assign_priority
+            from src.nb_priority import nb_train, nb_predict
+
+            if nb_model is None:
+                model_cache, nb_model, recovery_model = build_models(patients)
+            new_patients = run_admission_session(assign_priority, nb_train, nb_predict, patients, queue=queue,
+                                                 nb_model=nb_model, recovery_model=recovery_model,
+                                                 journal=journal)
             if new_patients:
                 patients.extend(new_patients)
+                for p in new_patients:
+                    stats.add(p)
+                index.add_many(new_patients)
+                model_cache.add_many(new_patients)
+                model_cache.save(nb_model, recovery_model)
                 print(f"{len(new_patients)} patients added successfully.")
+                if journal.records >= COMPACT_THRESHOLD:
+                    compactor = compact_in_background(patients, journal, MAIN_DATASET)
             pause()
 
        
         elif choice == "2":
-            show_patients_table(patients, limit=40)
-            pause()
+            browse("All patients", lambda after, before: page_list(patients, after=after, before=before),
+                   len(patients))
 
         
         elif choice == "3":
-            prio, injury, consci = compute_statistics(patients)
-            current_count = len(patients)
+            prio, injury, consci = stats.statistics()
+            if charts is None:
+                charts = start_render_queue()
             print("\n--- UPDATED STATISTICS ---")
             print("Priority Counts:", prio)
             print("Injury Type Counts:", injury)
             print("Conscious/Unconscious Counts:", consci)
+            for vital, summary in stats.vital_summary().items():
+                print(f"{vital:<15} mean={summary['mean']:.2f}  std={summary['variance'] ** 0.5:.2f}")
 
             while True:
                 print("\nWhich visualization would you like to see?")
@@ -121,19 +198,15 @@ def main():
                 sub_choice = input("Enter choice: ").strip()
 
                 if sub_choice == "1":
-                    plot_priority_distribution(prio, current_patient_count=current_count)
-                    print("Priority distribution updated and saved.")
+                    queue_chart(charts, "priority_distribution", prio)
                 elif sub_choice == "2":
-                    plot_injury_distribution(injury, current_patient_count=current_count)
-                    print("Injury distribution updated and saved.")
+                    queue_chart(charts, "injury_distribution", injury)
                 elif sub_choice == "3":
-                    plot_consciousness_distribution(consci, current_patient_count=current_count)
-                    print("Consciousness distribution updated and saved.")
+                    queue_chart(charts, "consciousness_distribution", consci)
                 elif sub_choice == "4":
-                    plot_priority_distribution(prio, current_patient_count=current_count)
-                    plot_injury_distribution(injury, current_patient_count=current_count)
-                    plot_consciousness_distribution(consci, current_patient_count=current_count)
-                    print("All charts updated and saved.")
+                    queue_chart(charts, "priority_distribution", prio)
+                    queue_chart(charts, "injury_distribution", injury)
+                    queue_chart(charts, "consciousness_distribution", consci)
                 elif sub_choice == "0":
                     break
                 else:
@@ -142,40 +215,79 @@ def main():
 
         
         elif choice == "4":
-            sorted_list = sort_by_priority(list(patients))
-            print("\nPatients sorted by priority:")
-            show_patients_table(sorted_list, limit=40)
-            pause()
+            browse("Patients sorted by priority", lambda after, before: queue.page(after=after, before=before),
+                   len(queue))
 
         
         elif choice == "5":
-            filtered = filter_by_injury_menu(patients)
-            print("\nPatients (filtered):")
-            show_patients_table(filtered, limit=40)
-            pause()
+            filtered = filter_by_injury_menu(patients, index)
+            browse("Patients (filtered, by priority)",
+                   lambda after, before: page_list(filtered, key=priority_key, after=after, before=before),
+                   len(filtered))
 
         
         elif choice == "6":
-            pts = []
-            for p in patients:
-                try:
-                    pts.append((float(p["Heart_Rate"]), float(p["Oxygen_Level"])))
-                except:
-                    pass
-
-            if len(pts) < 3:
+            hr, o2 = patients.column("Heart_Rate"), patients.column("Oxygen_Level")
+
+            if len(hr) < 3:
                 print("Not enough numeric data for clustering (need ≥3).")
             else:
-                centroids, clusters = kmeans(pts, k=3)
+                from src.kmeans import kmeans_fit, points_from_columns, cluster_sizes
+                from src.render_queue import columns_digest
+
+                if charts is None:
+                    charts = start_render_queue()
+                # an (n, 2) array straight from the columns; it goes to the renderer as is
+                pts = points_from_columns(hr, o2)
+                centroids, labels, _ = kmeans_fit(pts, k=3, seed=0)
+                sizes = cluster_sizes(labels, len(centroids))
                 print("\nK-Means clusters:")
-                for i, c in enumerate(clusters):
-                    print(f"  Cluster {i+1}: {len(c)} points | centroid={centroids[i]}")
-                plot_clusters(clusters, centroids, current_patient_count=len(patients))
+                for i, c in enumerate(centroids):
+                    print(f"  Cluster {i+1}: {sizes[i]} points | centroid={c}")
+
+                # the clustering is seeded, so the raw columns (and k) decide the whole chart
+                queue_chart(charts, "cluster_plot", pts, labels, centroids,
+                            key=(columns_digest(hr, o2), len(centroids)))
+            pause()
+
+        elif choice == "7":
+            from src.bulk_admit import read_batch, bulk_admit
+
+            path = input("Intake file path: ").strip()
+            if nb_model is None:
+                model_cache, nb_model, recovery_model = build_models(patients)
+            rows = read_batch(path)
+            admitted = bulk_admit(rows, nb_model=nb_model, recovery_model=recovery_model, queue=queue,
+                                  patients=patients, stats=stats, journal=journal)
+            index.add_many(admitted)
+            model_cache.add_many(admitted)
+            model_cache.save(nb_model, recovery_model)
+            counts = {}
+            for p in admitted:
+                counts[p["Priority"]] = counts.get(p["Priority"], 0) + 1
+            print(f"{len(admitted)} patients admitted. Priority counts: {dict(sorted(counts.items()))}")
+            if journal.records >= COMPACT_THRESHOLD:
+                compactor = compact_in_background(patients, journal, MAIN_DATASET)
+            pause()
+
+        elif choice == "8":
+            if instrumentation.is_enabled():
+                dump_metrics()
+            else:
+                print("Metrics are off. Start the dashboard with TRIAGE_METRICS=1 to record them.")
             pause()
 
        
         elif choice == "0":
-            save_csv(MAIN_DATASET, patients)
+            if compactor is not None:
+                compactor.join()
+            if journal.records:
+                compact(patients, journal, MAIN_DATASET)
+            journal.close()
+            if charts is not None:
+                charts.shutdown(wait=True)
+            if instrumentation.is_enabled():
+                dump_metrics()
             print("\nAll patients saved. Goodbye.")
             break
 
@@ -0,0 +1,164 @@
+# append-only journal of admissions.
+# every admitted patient is written as one JSON line as soon as it is entered, so a crash
+# does not lose the session and a durable write costs O(new records) instead of rewriting
+# the whole patients.csv. On startup the journal is replayed on top of the last compacted
+# CSV/snapshot, and compaction folds it back into the CSV (optionally in the background).
+import os
+import json
+import time
+import threading
+
+from src.admissions_io import DATA_DIR, MAIN_DATASET, save_csv, save_snapshot
+
+JOURNAL_PATH = os.path.join(DATA_DIR, "admissions.journal")
+COMPACT_THRESHOLD = 1000  # journal records before a background compaction is started
+_compact_lock = threading.Lock()
+
+JOURNAL_FIELDS = [
+    "Name", "Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level",
+    "Consciousness", "Injury_Type", "Priority", "Recovery_Time"
+]
+
+
+def _compacting_path(path):
+    return path + ".compacting"
+
+
+class AdmissionJournal:
+    """
+    Appends admissions to a JSON-lines file. fsync is batched: it runs every
+    sync_every records, when sync_interval seconds passed since the last one,
+    and on flush()/close().
+    """
+
+    def __init__(self, path=JOURNAL_PATH, sync_every=16, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        # records not yet folded into the CSV (including a rotated, unfinished one)
+        self.records = self._count(path) + self._count(_compacting_path(path))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _count(path):
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            return sum(1 for line in f if line.strip())
+
+    def append(self, patient):
+        line = json.dumps({k: patient.get(k, "") for k in JOURNAL_FIELDS}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._pending += 1
+            self.records += 1
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+
+    def append_many(self, patients):
+        """Journal a whole batch with one write and one fsync."""
+        lines = [json.dumps({k: p.get(k, "") for k in JOURNAL_FIELDS}, ensure_ascii=False) + "\n"
+                 for p in patients]
+        if not lines:
+            return
+        with self._lock:
+            self._file.write("".join(lines))
+            self.records += len(lines)
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def rotate(self):
+        """Move the current journal aside (to be compacted) and start an empty one."""
+        with self._lock:
+            self._sync()
+            self._file.close()
+            aside = _compacting_path(self.path)
+            if os.path.exists(aside):
+                # an earlier compaction did not finish: keep its records too
+                with open(aside, "a", encoding="utf-8") as out, open(self.path, "r", encoding="utf-8") as cur:
+                    out.write(cur.read())
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, aside)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.records = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+
+def replay_journal(path=JOURNAL_PATH):
+    """
+    Yield the journaled admissions in order: first a journal left over from an
+    interrupted compaction, then the live one. A torn last line is ignored.
+    """
+    for p in (_compacting_path(path), path):
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def compact(patients, journal, csv_path=MAIN_DATASET, count=None):
+    """
+    Fold the journal into the CSV and snapshot. Only the first `count` patients are
+    written (everything admitted before the journal was rotated); later admissions stay
+    in the new journal. The rotated journal is removed as soon as the new CSV is in
+    place; the snapshot is written after that and is checked against the CSV on load,
+    so a crash while it is written only costs a rebuild, never replayed duplicates.
+    """
+    with _compact_lock:
+        if count is None:
+            count = len(patients)
+            journal.rotate()
+        rows = patients[:count]
+
+        tmp = csv_path + ".tmp"
+        save_csv(tmp, rows)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())  # the CSV must be on disk before its journal is dropped
+        os.replace(tmp, csv_path)
+
+        leftover = _compacting_path(journal.path)
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+        if hasattr(patients, "column"):
+            save_snapshot(patients, csv_path, count=count)
+
+
+def compact_in_background(patients, journal, csv_path=MAIN_DATASET):
+    """Rotate the journal now and rewrite the CSV/snapshot in a background thread."""
+    # waits for a compaction that is still running, so two never touch the files at once
+    with _compact_lock:
+        count = len(patients)
+        journal.rotate()
+    t = threading.Thread(target=compact, args=(patients, journal, csv_path, count), daemon=False)
+    t.start()
+    return t
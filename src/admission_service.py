@@ -0,0 +1,209 @@
+# local admission service so several triage desks can admit patients at the same time.
+# it speaks JSON lines over TCP: every request is one JSON object on one line and every
+# reply is one JSON object on one line. Only the standard library is used, and
+# AdmissionClient below is a small stand-in client for the desks (and for testing).
+#
+#   python -m src.admission_service --port 8765
+#
+# requests:
+#   {"op": "admit", "patient": {"Name": ..., "Age": ..., "Heart_Rate": ..., ...}}
+#   {"op": "queue", "n": 10}      next patients in priority order
+#   {"op": "stats"}               counts and vital means/variances
+#   {"op": "ping"}
+import json
+import asyncio
+import argparse
+
+from src.admissions_io import clean_record, load_preprocessed, MAIN_DATASET
+from src.admission_journal import AdmissionJournal, JOURNAL_FIELDS, replay_journal
+from src.triage_logic import assign_priority
+from src.nb_priority import nb_train, MIN_SAMPLES_FOR_ML
+from src.regression import RecoveryRegression, RECOVERY_FEATURES, has_recovery_time
+from src.queue_manager import TriageQueue
+from src.stats_aggregator import StatsAggregator
+from src.model_cache import ModelCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def _public(patient_id, p):
+    out = {k: p.get(k, "") for k in JOURNAL_FIELDS}
+    out["id"] = patient_id
+    return out
+
+
+class AdmissionService:
+    """Shared in-memory state behind the service: patients, live queue, models and statistics."""
+
+    def __init__(self, patients=None, journal=None, model_cache=None):
+        self.patients = patients if patients is not None else []
+        self.journal = journal
+        self.model_cache = model_cache
+        self.queue = TriageQueue(self.patients)
+        if model_cache is not None:
+            self.nb_model, self.recovery_model = model_cache.load_or_train(self.patients)
+        else:
+            self.nb_model = nb_train(self.patients)
+            self.recovery_model = RecoveryRegression(RECOVERY_FEATURES).add_many(
+                p for p in self.patients if has_recovery_time(p))
+        self.stats = StatsAggregator.from_patients(self.patients)
+        self._write_lock = asyncio.Lock()
+        self._server = None
+
+    def _admit(self, raw):
+        p = clean_record(raw, typed=True)
+        rule_priority = assign_priority(p)
+
+        ml_priority = None
+        if self.nb_model is not None and self.nb_model.total >= MIN_SAMPLES_FOR_ML:
+            ml_priority = self.nb_model.predict(p)
+
+        # a recovery time sent by the desk is kept (and trained on), otherwise it is predicted
+        recorded = has_recovery_time(p)
+        recovery_time = p["Recovery_Time"] if recorded else 0.0
+        if not recorded and self.recovery_model.n:
+            recovery_time = round(self.recovery_model.predict(p), 2)
+
+        p["Priority"] = rule_priority
+        p["Recovery_Time"] = recovery_time
+
+        self.patients.append(p)
+        patient_id = self.queue.push(p)
+        if self.nb_model is None:
+            self.nb_model = nb_train([p])
+        else:
+            self.nb_model.update(p)
+        if recorded:
+            self.recovery_model.add(p)
+        self.stats.add(p)
+        if self.model_cache is not None:
+            self.model_cache.add(p)
+        return {
+            "ok": True, "id": patient_id, "priority": rule_priority,
+            "ml_priority": ml_priority, "recovery_time": recovery_time,
+        }, p
+
+    async def handle(self, request):
+        op = request.get("op")
+        if op == "admit":
+            patient = request.get("patient")
+            if not isinstance(patient, dict):
+                return {"ok": False, "error": "admit needs a 'patient' object"}
+            # admissions are applied one at a time so the queue/models never see half an update
+            async with self._write_lock:
+                reply, p = self._admit(patient)
+                if self.journal is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.journal.append, p)
+            return reply
+        if op == "queue":
+            try:
+                n = int(request.get("n", 10))
+            except (TypeError, ValueError, OverflowError):
+                return {"ok": False, "error": "queue needs an integer 'n'"}
+            return {"ok": True, "size": len(self.queue),
+                    "patients": [_public(i, p) for i, p in self.queue.peek(n)]}
+        if op == "stats":
+            prio, injury, consci = self.stats.statistics()
+            return {"ok": True, "count": self.stats.count, "priority": prio, "injury": injury,
+                    "consciousness": consci, "vitals": self.stats.vital_summary()}
+        if op == "ping":
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op: {op!r}"}
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    reply = await self.handle(request) if isinstance(request, dict) else \
+                        {"ok": False, "error": "request must be a JSON object"}
+                except (TypeError, ValueError, OverflowError) as e:
+                    # a malformed request is answered, it never drops the desk's connection
+                    reply = {"ok": False, "error": f"bad request: {e}"}
+                writer.write((json.dumps(reply, default=str) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start listening; port=0 picks a free port (see self.port)."""
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1] if self._server else None
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.journal is not None:
+            self.journal.flush()
+        if self.model_cache is not None:
+            self.model_cache.save(self.nb_model, self.recovery_model)
+
+
+class AdmissionClient:
+    """Minimal client for the service, one JSON line per request."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, op, **fields):
+        fields["op"] = op
+        self._writer.write((json.dumps(fields) + "\n").encode("utf-8"))
+        await self._writer.drain()
+        return json.loads(await self._reader.readline())
+
+    async def admit(self, patient):
+        return await self.request("admit", patient=patient)
+
+    async def next_patients(self, n=10):
+        return await self.request("queue", n=n)
+
+    async def stats(self):
+        return await self.request("stats")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, csv_path=MAIN_DATASET):
+    patients = load_preprocessed(csv_path)
+    patients.extend(replay_journal())
+    service = AdmissionService(patients, journal=AdmissionJournal(), model_cache=ModelCache())
+    server = await service.start(host, port)
+    print(f"[SERVE] Admission service listening on {host}:{service.port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        service.journal.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the admission service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,11 +1,20 @@
 import os
 import csv
-from src.triage_logic import assign_priority
-from src.regression import predict_recovery_time, train_recovery_model
+import sys
+import math
+import json
+import mmap
+import struct
+import hashlib
+from array import array
+from src.instrumentation import timed, incr
+from src.patient_store import PatientStore, NUMERIC_FIELDS, CATEGORICAL_FIELDS
 
 DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../dataset"))
 MAIN_DATASET = os.path.join(DATA_DIR, "patients.csv")
-os.makedirs(DATA_DIR, exist_ok=True)
+SITES_DIR = os.path.join(DATA_DIR, "sites")  # one patients.csv per ward/site: sites/<site>/patients.csv
+COMBINED_DATASET = os.path.join(DATA_DIR, "combined_patients.csv")
+SNAPSHOT_MAGIC = b"TRIAGESNAP1\n"
 
 # columns that the original dataset has.
 ORIGINAL_FIELDS = [
@@ -14,12 +23,24 @@ ORIGINAL_FIELDS = [
     "Recovery_Time"
 ]
 
+DEFAULT_CHUNK_SIZE = 10000
+PARALLEL_THRESHOLD = 200000  # below this preprocess_dataset stays single-process
+
 
 def _num_or_default(value, default="0"):
     try:
-        return str(float(value))
+        x = float(value)
+    except:
+        return default
+    # "nan" / "inf" parse as floats but would poison the models
+    return str(x) if math.isfinite(x) else default
+
+def _float_or_default(value, default=0.0):
+    try:
+        x = float(value)
     except:
         return default
+    return x if math.isfinite(x) else default
 
 def _normalize_consciousness(v):
     v = str(v).strip().lower()
@@ -36,36 +57,34 @@ def _normalize_injury(v):
     return v.capitalize()
 
 
-def clean_record(p):
-    """Normalize record fields """
+def clean_record(p, typed=False):
+    """Normalize record fields (typed=True keeps the vitals as floats instead of strings)"""
     c = {}
+    num = _float_or_default if typed else _num_or_default
 
     c["Name"] = str(p.get("Name", "")).strip().title() or "Unknown"
 
-    c["Age"] = _num_or_default(p.get("Age", "0"))
-    c["Heart_Rate"] = _num_or_default(p.get("Heart_Rate", "0"))
-    c["Blood_Pressure"] = _num_or_default(p.get("Blood_Pressure", "0"))
-    c["Oxygen_Level"] = _num_or_default(p.get("Oxygen_Level", "0"))
-    c["Recovery_Time"] = _num_or_default(p.get("Recovery_Time", "0"))
+    c["Age"] = num(p.get("Age", "0"))
+    c["Heart_Rate"] = num(p.get("Heart_Rate", "0"))
+    c["Blood_Pressure"] = num(p.get("Blood_Pressure", "0"))
+    c["Oxygen_Level"] = num(p.get("Oxygen_Level", "0"))
+    c["Recovery_Time"] = num(p.get("Recovery_Time", "0"))
 
     c["Consciousness"] = _normalize_consciousness(p.get("Consciousness", "Conscious"))
     c["Injury_Type"] = _normalize_injury(p.get("Injury_Type", "None"))
 
     return c
 
+@timed("clean_dataset")
 def clean_dataset(patients):
     return [clean_record(p) for p in patients]
 
 
-def load_csv(path=MAIN_DATASET):
-    """Load the dataset"""
-    if not os.path.exists(path):
-        print(f"[WARN] Dataset not found: {path}")
-        return []
-
-    with open(path, "r", encoding="utf-8") as f:
+def iter_csv(path=MAIN_DATASET, errors="strict"):
+    """Yield the dataset rows one at a time (only the original columns).
+    errors is passed to open(), "replace" keeps going over bytes that are not UTF-8."""
+    with open(path, "r", encoding="utf-8", errors=errors) as f:
         reader = csv.DictReader(f)
-        data = []
 
         for row in reader:
             # Ignore empty lines
@@ -73,14 +92,43 @@ def load_csv(path=MAIN_DATASET):
                 continue
 
             # Keep only original columns
-            cleaned_row = {col: row.get(col, "") for col in ORIGINAL_FIELDS}
-            data.append(cleaned_row)
+            yield {col: row.get(col, "") for col in ORIGINAL_FIELDS}
+
+
+def iter_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Group any iterable of rows into lists of at most chunk_size rows."""
+    chunk = []
+    for r in rows:
+        chunk.append(r)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@timed("load_csv")
+def load_csv(path=MAIN_DATASET):
+    """Load the dataset"""
+    if not os.path.exists(path):
+        print(f"[WARN] Dataset not found: {path}")
+        return []
+
+    data = list(iter_csv(path))
+    incr("records_loaded", len(data))
 
     print(f"[LOAD] Loaded {len(data)} records from {path}")
     return data
 
 
+def load_store(path=MAIN_DATASET):
+    """Load and clean the dataset straight into a typed PatientStore (parsed only once)."""
+    return PatientStore.from_records(clean_record(r, typed=True) for r in load_csv(path))
+
+
+@timed("save_csv")
 def save_csv(path, data):
+    _ensure_parent(path)
     with open(path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=ORIGINAL_FIELDS)
         writer.writeheader()
@@ -92,29 +140,474 @@ def save_csv(path, data):
     print(f"[SAVE] Saved {len(data)} records → {path}")
 
 
-def preprocess_dataset(patients):
+def _ensure_parent(path):
+    # directories are created when something is written, not when the module is imported
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+
+def _set_priorities(patients):
+    """Run the triage rules over all patients in one batch."""
+    from src.triage_logic import assign_priority_batch
+
+    priorities = assign_priority_batch(patients)
+    if hasattr(patients, "set_column"):
+        patients.set_column("Priority", priorities)
+        return
+    for p, pr in zip(patients, priorities):
+        p["Priority"] = int(pr)
+
+
+def _needs_recovery(p):
+    """True when the recovery time is missing or zero (unparsable values become "0")."""
+    try:
+        return not p.get("Recovery_Time") or float(p["Recovery_Time"]) == 0
+    except:
+        p["Recovery_Time"] = "0"
+        return False
+
+
+@timed("preprocess_dataset")
+def preprocess_dataset(patients, workers=None, parallel_threshold=PARALLEL_THRESHOLD):
     """
     Add priority and predict missing recovery time.
     This modifies only the in-memory dictionary.
+
+    Datasets with at least parallel_threshold patients are split into shards and
+    processed by a pool of `workers` processes (default: one per CPU).
     """
+    from src.regression import train_recovery_model, predict_recovery_times
 
     # Train regression model only with valid recovery values
     valid = [p for p in patients if float(p.get("Recovery_Time", 0)) > 0]
-    if valid:
-        train_recovery_model(valid)
+    model = train_recovery_model(valid) if valid else None
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(patients) >= parallel_threshold:
+        return _preprocess_parallel(patients, model, workers)
 
-    for p in patients:
+    _set_priorities(patients)
 
+    # recovery time is missing or zero, predicted below in one batch
+    missing = [p for p in patients if _needs_recovery(p)]
+
+    if missing:
         try:
-            p["Priority"] = assign_priority(p)
+            predicted = predict_recovery_times(missing)
         except:
-            p["Priority"] = 0
+            predicted = None
+        for i, p in enumerate(missing):
+            p["Recovery_Time"] = round(predicted[i], 2) if predicted is not None else "0"
+
+    return patients
+
+
+def _shard_bounds(n, shards):
+    step = -(-n // shards)
+    return [(a, min(a + step, n)) for a in range(0, n, step)]
+
 
-        # predict recovery time if it is missing or zero
+def _store_shard(store, a, b):
+    """A PatientStore over rows a..b, made of column slices (cheap to send to a worker)."""
+    return PatientStore.from_columns(
+        store.names()[a:b],
+        {f: store.column(f)[a:b] for f in NUMERIC_FIELDS},
+        store.column("Priority")[a:b],
+        {f: store.codes(f)[a:b] for f in CATEGORICAL_FIELDS},
+        {f: store.categories(f) for f in CATEGORICAL_FIELDS},
+    )
+
+
+def _preprocess_shard(args):
+    shard, model = args
+    process_chunk(shard, model)
+    if hasattr(shard, "column"):
+        return shard.column("Priority"), shard.column("Recovery_Time")
+    return shard
+
+
+def _preprocess_parallel(patients, model, workers):
+    # the model is trained once above; only its coefficients travel with each shard
+    from concurrent.futures import ProcessPoolExecutor
+
+    bounds = _shard_bounds(len(patients), workers * 4)
+    if hasattr(patients, "column"):
+        shards = [(_store_shard(patients, a, b), model) for a, b in bounds]
+    else:
+        shards = [(list(patients[a:b]), model) for a, b in bounds]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_preprocess_shard, shards))
+
+    # merge back in the original order
+    if hasattr(patients, "column"):
+        priority, recovery = array("b"), array("d")
+        for pr, rec in results:
+            priority.extend(pr)
+            recovery.extend(rec)
+        patients.set_column("Priority", priority)
+        patients.set_column("Recovery_Time", recovery)
+    else:
+        patients[:] = [p for shard in results for p in shard]
+    return patients
+
+
+def _has_recovery(p):
+    try:
+        return float(p.get("Recovery_Time", 0)) > 0
+    except:
+        return False
+
+
+@timed("process_chunk")
+def process_chunk(chunk, model):
+    """Priority + missing recovery time for one chunk of cleaned records."""
+    from src.regression import predict_many
+
+    _set_priorities(chunk)
+    missing = [p for p in chunk if _needs_recovery(p)]
+
+    if missing:
         try:
-            if not p.get("Recovery_Time") or float(p["Recovery_Time"]) == 0:
-                p["Recovery_Time"] = round(predict_recovery_time(p), 2)
+            predicted = predict_many(model, missing) if model else None
         except:
-            p["Recovery_Time"] = "0"
+            predicted = None
+        for i, p in enumerate(missing):
+            p["Recovery_Time"] = round(predicted[i], 2) if predicted is not None else "0"
+    return chunk
 
-    return patients
+
+def stream_preprocess(path=MAIN_DATASET, chunk_size=DEFAULT_CHUNK_SIZE, model=None, bounded=True):
+    """
+    Streaming version of load_csv -> clean_dataset -> preprocess_dataset.
+    Yields lists of processed records, chunk_size at a time.
+
+    The recovery model only needs X^T X and X^T y, so it is fitted in a first pass.
+    bounded=True reads the file twice and never holds more than one chunk in memory,
+    bounded=False reads it once and keeps the cleaned chunks until the model is fitted.
+    Pass an already trained model ({"features", "beta"}) to skip the fitting pass.
+    """
+    if not os.path.exists(path):
+        print(f"[WARN] Dataset not found: {path}")
+        return
+
+    def cleaned():
+        for chunk in iter_chunks(iter_csv(path), chunk_size):
+            yield [clean_record(r, typed=True) for r in chunk]
+
+    if model is not None:
+        for chunk in cleaned():
+            yield process_chunk(chunk, model)
+        return
+
+    from src.regression import RecoveryRegression, RECOVERY_FEATURES
+
+    reg = RecoveryRegression(RECOVERY_FEATURES)
+    kept = []
+    for chunk in cleaned():
+        reg.add_many(p for p in chunk if _has_recovery(p))
+        if not bounded:
+            kept.append(chunk)
+
+    try:
+        model = reg.to_model() if reg.n else None
+    except ValueError:
+        model = None
+
+    for chunk in (kept if not bounded else cleaned()):
+        yield process_chunk(chunk, model)
+    kept.clear()
+
+
+def stream_to_csv(src_path, dst_path, chunk_size=DEFAULT_CHUNK_SIZE, bounded=True):
+    """Run the streaming pipeline and write every chunk to dst_path as soon as it is ready."""
+    total = 0
+    _ensure_parent(dst_path)
+    with open(dst_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=ORIGINAL_FIELDS + ["Priority"])
+        writer.writeheader()
+        for chunk in stream_preprocess(src_path, chunk_size=chunk_size, bounded=bounded):
+            writer.writerows({field: p.get(field, "") for field in ORIGINAL_FIELDS + ["Priority"]} for p in chunk)
+            total += len(chunk)
+
+    print(f"[SAVE] Streamed {total} records → {dst_path}")
+    return total
+
+
+# ---------------------------------------------------------------------------
+# multi-site combined dataset.
+# every site file is loaded, cleaned and triaged by its own worker process, which also
+# fits that site's NB counts and regression statistics. The parent drops patients that
+# appear at more than one site (taking them back out of that site's models) and adds the
+# site models together, which gives the models of the merged rows without a second pass.
+
+def site_dataset_paths(sites_dir=SITES_DIR, main=MAIN_DATASET):
+    """The local dataset plus every sites/<site>/patients.csv (or sites/*.csv)."""
+    paths = [main] if os.path.exists(main) else []
+    if os.path.isdir(sites_dir):
+        for entry in sorted(os.listdir(sites_dir)):
+            full = os.path.join(sites_dir, entry)
+            if os.path.isdir(full):
+                full = os.path.join(full, "patients.csv")
+            if full.endswith(".csv") and os.path.isfile(full):
+                paths.append(full)
+    return paths
+
+
+def _dedup_key(p):
+    # the same admission exported by two sites. Recovery_Time is left out because only
+    # one of them may have filled it in; everything the triage rules read is in the key.
+    return (p["Name"], p["Age"], p["Heart_Rate"], p["Blood_Pressure"], p["Oxygen_Level"],
+            p["Consciousness"], p["Injury_Type"])
+
+
+def _load_site(path):
+    """Worker: cleaned, triaged, de-duplicated rows of one site plus its shard models."""
+    from src.nb_priority import NBModel
+    from src.regression import RecoveryRegression, RECOVERY_FEATURES
+
+    rows, seen = [], {}
+    for r in iter_csv(path):
+        p = clean_record(r, typed=True)
+        key = _dedup_key(p)
+        if key not in seen:
+            seen[key] = len(rows)
+            rows.append(p)
+        elif _has_recovery(p) and not _has_recovery(rows[seen[key]]):
+            rows[seen[key]] = p  # keep the copy that has a recovery time
+    _set_priorities(rows)
+
+    nb = NBModel().partial_fit(rows)
+    reg = RecoveryRegression(RECOVERY_FEATURES).add_many(p for p in rows if _has_recovery(p))
+    return rows, nb, reg
+
+
+@timed("merge_datasets")
+def merge_datasets(paths=None, out_path=COMBINED_DATASET, workers=None):
+    """
+    Load the site files in parallel, de-duplicate and merge them.
+    Returns (patients, nb_model, recovery_model) and writes the patients to out_path
+    (unless it is None). Missing recovery times are predicted by the merged regression.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from src.regression import predict_many
+
+    paths = site_dataset_paths() if paths is None else list(paths)
+    if not paths:
+        print("[WARN] No site datasets found.")
+        return [], None, None
+
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(_load_site, paths))
+    else:
+        shards = [_load_site(path) for path in paths]
+
+    patients, index = [], {}
+    nb_model = recovery_model = None
+    for path, (rows, nb, reg) in zip(paths, shards):
+        duplicates = 0
+        for p in rows:
+            key = _dedup_key(p)
+            if key not in index:
+                index[key] = len(patients)
+                patients.append(p)
+                continue
+            # seen at an earlier site: one copy stays, and the models have to agree
+            duplicates += 1
+            nb.remove(p)  # same triage inputs, so the NB counts of both copies are equal
+            if _has_recovery(p) and not _has_recovery(patients[index[key]]):
+                patients[index[key]] = p  # its recovery row stays in reg, the old copy had none
+            elif _has_recovery(p):
+                reg.remove(p)
+        print(f"[LOAD] {len(rows)} patients from {path} ({duplicates} already seen at another site)")
+        nb_model = nb if nb_model is None else nb_model.merge(nb)
+        recovery_model = reg if recovery_model is None else recovery_model.merge(reg)
+
+    missing = [p for p in patients if _needs_recovery(p)]
+    if missing and recovery_model.n:
+        try:
+            predicted = predict_many(recovery_model.to_model(), missing)
+        except ValueError:
+            predicted = None
+        if predicted is not None:
+            for p, y in zip(missing, predicted):
+                p["Recovery_Time"] = round(y, 2)
+
+    incr("records_merged", len(patients))
+    if out_path:
+        save_csv(out_path, patients)
+    return patients, nb_model, recovery_model
+
+
+def get_combined_dataset_path(refresh=False):
+    """Path of the combined CSV, rebuilt first when it is missing or a site file is newer."""
+    paths = site_dataset_paths()
+    stale = refresh or not os.path.exists(COMBINED_DATASET) or any(
+        os.path.getmtime(p) > os.path.getmtime(COMBINED_DATASET) for p in paths)
+    if stale and paths:
+        merge_datasets(paths, COMBINED_DATASET)
+    return COMBINED_DATASET
+
+
+def dataset_to_dict(rows):
+    """Cleaned plain dicts (vitals as floats) from raw CSV rows or a PatientStore."""
+    if hasattr(rows, "to_records"):
+        return rows.to_records()
+    return [clean_record(r, typed=True) for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# binary snapshot of a preprocessed PatientStore.
+# layout: magic | header length (8 bytes) | JSON header | 8-byte aligned column blocks.
+# the numeric columns are raw machine arrays, so the file can be memory-mapped and the
+# columns copied straight into typed arrays without parsing anything.
+
+def snapshot_path_for(csv_path=MAIN_DATASET):
+    return os.path.splitext(csv_path)[0] + ".snapshot"
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def derivation_version():
+    """Hash of what the derived columns depend on: the triage rules and the recovery
+    features. A snapshot written under other rules is stale even if the CSV is not."""
+    from src.triage_logic import RULES, DEFAULT_PRIORITY, NUMERIC_ATTRS, TEXT_ATTRS
+    from src.regression import RECOVERY_FEATURES
+
+    spec = [RULES, DEFAULT_PRIORITY, NUMERIC_ATTRS, TEXT_ATTRS, RECOVERY_FEATURES]
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def csv_fingerprint(csv_path, with_hash=True):
+    st = os.stat(csv_path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        fp["sha1"] = _file_sha1(csv_path)
+    return fp
+
+
+@timed("save_snapshot")
+def save_snapshot(store, csv_path=MAIN_DATASET, path=None, count=None):
+    """Write the store (with Priority / Recovery_Time) next to the CSV it was built from.
+    count limits the snapshot to the first `count` patients."""
+    path = path or snapshot_path_for(csv_path)
+    count = len(store) if count is None else count
+
+    blocks = []
+    for f in NUMERIC_FIELDS + ["Priority"]:
+        blocks.append((f, store.column(f)[:count]))
+    for f in CATEGORICAL_FIELDS:
+        blocks.append((f, store.codes(f)[:count]))
+    names = "\x00".join(store.names()[:count]).encode("utf-8")
+
+    header = {
+        "count": count,
+        "byteorder": sys.byteorder,
+        "source": csv_fingerprint(csv_path) if os.path.exists(csv_path) else None,
+        "derivation": derivation_version(),
+        "categories": {f: store.categories(f) for f in CATEGORICAL_FIELDS},
+        "columns": {},
+    }
+    offset = 0
+    for name, arr in blocks:
+        nbytes = len(arr) * arr.itemsize
+        header["columns"][name] = {"typecode": arr.typecode, "offset": offset, "nbytes": nbytes}
+        offset += nbytes + (-nbytes % 8)
+    header["columns"]["Name"] = {"typecode": "utf8", "offset": offset, "nbytes": len(names)}
+
+    raw_header = json.dumps(header).encode("utf-8")
+    raw_header += b" " * (-(len(SNAPSHOT_MAGIC) + 8 + len(raw_header)) % 8)
+
+    tmp = path + ".tmp"
+    _ensure_parent(tmp)
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(raw_header)))
+        f.write(raw_header)
+        for _, arr in blocks:
+            data = arr.tobytes()
+            f.write(data + b"\0" * (-len(data) % 8))
+        f.write(names)
+    os.replace(tmp, path)
+    print(f"[SAVE] Snapshot of {count} records → {path}")
+    return path
+
+
+def _snapshot_is_fresh(source, csv_path):
+    if not source or not os.path.exists(csv_path):
+        return False
+    current = csv_fingerprint(csv_path, with_hash=False)
+    if current["size"] != source.get("size"):
+        return False
+    if current["mtime_ns"] == source.get("mtime_ns"):
+        return True
+    # touched but maybe not changed: fall back to the content hash
+    return _file_sha1(csv_path) == source.get("sha1")
+
+
+@timed("load_snapshot")
+def load_snapshot(csv_path=MAIN_DATASET, path=None):
+    """Return the PatientStore saved for csv_path, or None if there is none or it is stale."""
+    path = path or snapshot_path_for(csv_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+            pos = len(SNAPSHOT_MAGIC)
+            (hlen,) = struct.unpack("<Q", mm[pos:pos + 8])
+            header = json.loads(mm[pos + 8:pos + 8 + hlen])
+            if not _snapshot_is_fresh(header.get("source"), csv_path):
+                return None
+            if header.get("derivation") != derivation_version():
+                return None
+            base = pos + 8 + hlen
+
+            cols = {}
+            for name, meta in header["columns"].items():
+                start = base + meta["offset"]
+                raw = mm[start:start + meta["nbytes"]]
+                if meta["typecode"] == "utf8":
+                    cols[name] = raw.decode("utf-8").split("\x00") if raw else []
+                    continue
+                arr = array(meta["typecode"])
+                arr.frombytes(raw)
+                if header.get("byteorder") != sys.byteorder:
+                    arr.byteswap()
+                cols[name] = arr
+
+        # a header from another version or a damaged file is just a stale snapshot
+        if len(cols["Name"]) != header["count"]:
+            return None
+        store = PatientStore.from_columns(
+            cols["Name"],
+            {f: cols[f] for f in NUMERIC_FIELDS},
+            cols["Priority"],
+            {f: cols[f] for f in CATEGORICAL_FIELDS},
+            header["categories"],
+        )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, struct.error):
+        return None
+    print(f"[LOAD] Loaded {len(store)} records from snapshot {path}")
+    return store
+
+
+def load_preprocessed(csv_path=MAIN_DATASET):
+    """Warm start from the snapshot when it matches the CSV, otherwise rebuild it."""
+    store = load_snapshot(csv_path)
+    if store is not None:
+        return store
+    store = preprocess_dataset(load_store(csv_path))
+    if os.path.exists(csv_path):
+        save_snapshot(store, csv_path)
+    return store
@@ -53,3 +53,7 @@ def analyze_admissions():
     
 
     print("\n Analysis complete, the data and visuals updated.")
+
+
+if __name__ == "__main__":
+    analyze_admissions()
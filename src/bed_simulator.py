@@ -0,0 +1,308 @@
+# discrete-event simulation of the ward, for capacity planning.
+# patients arrive (replayed from a recorded stream or drawn as a Poisson process from the
+# historical case mix), wait in a TriageQueue, get a clinician for a treatment slot whose
+# length depends on the priority, and - unless they are priority 4 - keep a bed for their
+# recovery time (the recorded one, or the regression's prediction when it is missing).
+# Recovery_Time is in regression.RECOVERY_TIME_UNIT (hours); --recovery-unit days
+# converts a dataset that records it in days. The simulation itself runs in hours.
+# every run records bed occupancy, queue length and waiting times per hour; monte_carlo()
+# repeats it with different seeds in a process pool and turns it into a forecast.
+#
+#   python -m src.bed_simulator --days 7 --beds 30 --clinicians 5 --rate 3 --replications 2000
+import os
+import sys
+import math
+import heapq
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from src.queue_manager import TriageQueue
+from src.instrumentation import timed, incr
+
+DEFAULT_BEDS = 20
+DEFAULT_CLINICIANS = 4
+DEFAULT_RATE = 2.0           # arrivals per hour
+DEFAULT_DAYS = 7
+TREATMENT_HOURS = {1: 2.0, 2: 1.0, 3: 0.5, 4: 0.25}  # clinician time per patient
+NO_BED_PRIORITIES = (4,)     # treated and sent home without a bed
+MIN_STAY_HOURS = 1.0
+UNIT_HOURS = {"hours": 1.0, "days": 24.0}  # Recovery_Time unit -> hours (see regression.RECOVERY_TIME_UNIT)
+REPLICATIONS_PER_TASK = 50   # replications a worker runs per task
+
+# event kinds (ordered so that at the same time resources are freed before arrivals)
+_TREATED, _DISCHARGED, _ARRIVAL = 0, 1, 2
+
+
+def build_case_mix(patients, recovery_model=None, recovery_unit=None):
+    """
+    (priority, stay hours) for every historical patient: priority from the triage rules,
+    stay from the recorded Recovery_Time or, when it is missing, from recovery_model
+    (a RecoveryRegression or {"features", "beta"} model; fitted on the patients if None).
+    recovery_unit ("hours" / "days") defaults to regression.RECOVERY_TIME_UNIT.
+    """
+    from src.triage_logic import assign_priority_batch
+    from src.regression import RecoveryRegression, RECOVERY_FEATURES, RECOVERY_TIME_UNIT, predict_many
+
+    unit_hours = UNIT_HOURS[recovery_unit or RECOVERY_TIME_UNIT]
+
+    def recorded(p):
+        try:
+            y = float(p.get("Recovery_Time", 0))
+        except (TypeError, ValueError):
+            return 0.0
+        return y if math.isfinite(y) and y > 0 else 0.0
+
+    patients = list(patients)
+    stays = [recorded(p) for p in patients]
+    missing = [p for p, y in zip(patients, stays) if y == 0]
+    if missing:
+        if recovery_model is None:
+            recovery_model = RecoveryRegression(RECOVERY_FEATURES).add_many(
+                p for p, y in zip(patients, stays) if y > 0)
+        if hasattr(recovery_model, "to_model"):
+            recovery_model = recovery_model.to_model() if recovery_model.n else None
+        predicted = iter(predict_many(recovery_model, missing) if recovery_model else [0.0] * len(missing))
+        stays = [y if y > 0 else next(predicted) for y in stays]
+
+    priorities = assign_priority_batch(patients)
+    return [(int(pr), max(MIN_STAY_HOURS, y * unit_hours)) for pr, y in zip(priorities, stays)]
+
+
+def poisson_arrivals(rate, hours, rng, hourly_profile=None):
+    """Arrival times over [0, hours). hourly_profile (24 factors) scales the rate by hour of day."""
+    if rate <= 0:
+        return []
+    peak = rate * (max(hourly_profile) if hourly_profile else 1.0)
+    times, t = [], 0.0
+    while True:
+        t += rng.expovariate(peak)
+        if t >= hours:
+            return times
+        # thinning: keep the arrival with probability rate(t) / peak
+        if hourly_profile is None or rng.random() * peak < rate * hourly_profile[int(t) % 24]:
+            times.append(t)
+
+
+def simulate(cases, hours, beds=DEFAULT_BEDS, clinicians=DEFAULT_CLINICIANS, rate=DEFAULT_RATE,
+             seed=None, replay=False, arrival_times=None, hourly_profile=None, stay_sigma=0.25):
+    """
+    One run over `hours`. With replay=True the cases arrive in their recorded order, at
+    arrival_times if given or every 1/rate hours; otherwise Poisson arrivals pick random
+    cases. stay_sigma adds log-normal noise to the stays (0 = use them as they are).
+    Returns {"occupancy", "queue"} (one value per hour) and per-priority waiting times.
+    Patients still queued at the horizon count with their censored wait (hours - arrival),
+    and "waiting" gives how many of them there are per priority.
+    """
+    rng = random.Random(seed)
+    if replay:
+        times = arrival_times if arrival_times is not None else [i / rate for i in range(len(cases))]
+        stream = [(t, case) for t, case in zip(times, cases) if t < hours]
+    else:
+        stream = [(t, rng.choice(cases)) for t in poisson_arrivals(rate, hours, rng, hourly_profile)]
+
+    events = [(t, _ARRIVAL, i, case) for i, (t, case) in enumerate(stream)]
+    heapq.heapify(events)
+    seq = len(events)
+    bed_queue, walk_in_queue = TriageQueue(), TriageQueue()
+    free_beds, free_clinicians = beds, clinicians
+    occupancy, queue_len = [], []
+    waits = {}
+    next_tick = 0.0
+
+    while events:
+        now, kind, _, case = heapq.heappop(events)
+        # hourly samples of the state just before this event
+        while next_tick <= now and next_tick < hours:
+            occupancy.append(beds - free_beds)
+            queue_len.append(len(bed_queue) + len(walk_in_queue))
+            next_tick += 1.0
+        if now >= hours:
+            break
+
+        if kind == _ARRIVAL:
+            priority = case[0]
+            target = walk_in_queue if priority in NO_BED_PRIORITIES else bed_queue
+            target.push((now, case), priority=priority)
+        elif kind == _TREATED:
+            free_clinicians += 1
+        else:
+            free_beds += 1
+
+        # hand out free clinicians (and beds) by priority
+        while free_clinicians:
+            if bed_queue and free_beds:
+                _, (arrived, (priority, stay)) = bed_queue.pop()
+                free_beds -= 1
+                if stay_sigma:
+                    stay *= rng.lognormvariate(0.0, stay_sigma)
+                heapq.heappush(events, (now + stay, _DISCHARGED, seq, None))
+                seq += 1
+            elif walk_in_queue:
+                _, (arrived, (priority, stay)) = walk_in_queue.pop()
+            else:
+                break
+            free_clinicians -= 1
+            heapq.heappush(events, (now + TREATMENT_HOURS.get(priority, 0.5), _TREATED, seq, None))
+            seq += 1
+            waits.setdefault(priority, []).append(now - arrived)
+
+    # the tail of the horizon after the last event
+    while next_tick < hours:
+        occupancy.append(beds - free_beds)
+        queue_len.append(len(bed_queue) + len(walk_in_queue))
+        next_tick += 1.0
+
+    # patients never seen have waited at least until the horizon; leaving them out
+    # would make a saturated ward look fast
+    waiting = {}
+    for arrived, (priority, _) in bed_queue.ordered() + walk_in_queue.ordered():
+        waits.setdefault(priority, []).append(hours - arrived)
+        waiting[priority] = waiting.get(priority, 0) + 1
+
+    return {
+        "occupancy": occupancy,
+        "queue": queue_len,
+        "waits": waits,
+        "waiting": waiting,
+        "arrivals": len(stream),
+        "still_waiting": len(bed_queue) + len(walk_in_queue),
+    }
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _summarize(run):
+    # what travels back from a worker: the hourly series and a few numbers per priority
+    waits = {}
+    for priority, w in run["waits"].items():
+        w.sort()
+        waits[priority] = (len(w), sum(w) / len(w), _percentile(w, 0.9), run["waiting"].get(priority, 0))
+    return run["occupancy"], run["queue"], waits, run["still_waiting"]
+
+
+def _run_batch(args):
+    cases, hours, seeds, options = args
+    return [_summarize(simulate(cases, hours, seed=s, **options)) for s in seeds]
+
+
+@timed("monte_carlo")
+def monte_carlo(cases, days=DEFAULT_DAYS, replications=1000, workers=None, seed=0, **options):
+    """
+    Run `replications` independent simulations (each with its own seed) and return the
+    forecast: per hour the mean / p10 / p50 / p90 bed occupancy, the mean queue length
+    and the chance that every bed is taken, plus waiting hours per priority (patients
+    still waiting at the end count with the wait they had so far).
+    options are passed to simulate() (beds, clinicians, rate, replay, ...).
+    """
+    if replications < 1:
+        raise ValueError("replications must be at least 1")
+    hours = int(days * 24)
+    beds = options.get("beds", DEFAULT_BEDS)
+    seeds = [seed * 1000003 + i for i in range(replications)]
+    tasks = [(cases, hours, seeds[i:i + REPLICATIONS_PER_TASK], options)
+             for i in range(0, replications, REPLICATIONS_PER_TASK)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            runs = [r for batch in pool.map(_run_batch, tasks) for r in batch]
+    else:
+        runs = [r for task in tasks for r in _run_batch(task)]
+    incr("simulations_run", len(runs))
+
+    occupancy = {"mean": [], "p10": [], "p50": [], "p90": []}
+    queue_mean, full = [], []
+    for h in range(hours):
+        at_h = sorted(r[0][h] for r in runs)
+        occupancy["mean"].append(sum(at_h) / len(at_h))
+        for q in (10, 50, 90):
+            occupancy[f"p{q}"].append(_percentile(at_h, q / 100))
+        queue_mean.append(sum(r[1][h] for r in runs) / len(runs))
+        full.append(sum(1 for v in at_h if v >= beds) / len(at_h))
+
+    waits = {}
+    for priority in sorted({p for r in runs for p in r[2]}):
+        per_run = [r[2][priority] for r in runs if priority in r[2]]
+        n = sum(c for c, _, _, _ in per_run)
+        p90s = sorted(p90 for _, _, p90, _ in per_run)
+        waits[priority] = {
+            "patients": n / len(runs),
+            "mean": sum(c * m for c, m, _, _ in per_run) / n,
+            "p90": _percentile(p90s, 0.5),  # median over runs of each run's 90th percentile
+            "still_waiting": sum(w for _, _, _, w in per_run) / len(runs),
+        }
+
+    return {
+        "hours": hours,
+        "replications": len(runs),
+        "beds": beds,
+        "occupancy": occupancy,
+        "queue": queue_mean,
+        "full_probability": full,
+        "wait_hours": waits,
+        "still_waiting": sum(r[3] for r in runs) / len(runs),
+    }
+
+
+def daily_summary(forecast):
+    """Per day: mean and p90 of the peak occupancy, chance of a full ward, mean queue."""
+    rows = []
+    for d in range(forecast["hours"] // 24):
+        sl = slice(d * 24, (d + 1) * 24)
+        rows.append({
+            "day": d + 1,
+            "occupancy_mean": max(forecast["occupancy"]["mean"][sl]),
+            "occupancy_p90": max(forecast["occupancy"]["p90"][sl]),
+            "full_probability": max(forecast["full_probability"][sl]),
+            "queue_mean": sum(forecast["queue"][sl]) / 24,
+        })
+    return rows
+
+
+def main(argv=None):
+    from src.admissions_io import load_store, preprocess_dataset, MAIN_DATASET
+    from src.regression import RECOVERY_TIME_UNIT
+
+    parser = argparse.ArgumentParser(description="Forecast bed occupancy and waiting times.")
+    parser.add_argument("--csv", default=MAIN_DATASET, help="historical patients (case mix)")
+    parser.add_argument("--days", type=float, default=DEFAULT_DAYS)
+    parser.add_argument("--beds", type=int, default=DEFAULT_BEDS)
+    parser.add_argument("--clinicians", type=int, default=DEFAULT_CLINICIANS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="arrivals per hour")
+    parser.add_argument("--replay", action="store_true", help="replay the patients in file order")
+    parser.add_argument("--recovery-unit", choices=sorted(UNIT_HOURS), default=RECOVERY_TIME_UNIT,
+                        help="unit of Recovery_Time in the CSV (default: %(default)s)")
+    parser.add_argument("--replications", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # not load_preprocessed: that would write a .snapshot next to whatever CSV is given
+    cases = build_case_mix(preprocess_dataset(load_store(args.csv)), recovery_unit=args.recovery_unit)
+    if not cases:
+        print("No patients to build the case mix from.")
+        return 1
+    forecast = monte_carlo(cases, days=args.days, replications=args.replications, workers=args.workers,
+                           seed=args.seed, beds=args.beds, clinicians=args.clinicians, rate=args.rate,
+                           replay=args.replay)
+
+    print(f"\n{forecast['replications']} runs, {args.beds} beds, {args.clinicians} clinicians, "
+          f"{args.rate:g} arrivals/hour")
+    print("{:>4} {:>14} {:>13} {:>10} {:>11}".format("Day", "Peak occupancy", "p90 peak", "P(full)", "Mean queue"))
+    for row in daily_summary(forecast):
+        print("{:>4} {:>14.1f} {:>13.0f} {:>9.0%} {:>11.1f}".format(
+            row["day"], row["occupancy_mean"], row["occupancy_p90"], row["full_probability"], row["queue_mean"]))
+    print("\nWaiting time (hours) by priority, patients still waiting at the end count until then:")
+    for priority, w in forecast["wait_hours"].items():
+        print(f"  P{priority}: mean {w['mean']:.2f}  p90 {w['p90']:.2f}  ({w['patients']:.0f} patients per run, "
+              f"{w['still_waiting']:.0f} still waiting)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
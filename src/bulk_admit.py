@@ -0,0 +1,114 @@
+# bulk admission for mass-casualty intake: a whole roster (CSV or JSON lines) is cleaned,
+# triaged, given an NB suggestion and a predicted recovery time in one pass against one
+# trained model, and then merged into the live queue in a single step.
+import os
+import csv
+import json
+
+from src.admissions_io import clean_record, iter_csv
+from src.triage_logic import assign_priority_batch
+from src.regression import predict_many
+from src.nb_priority import MIN_SAMPLES_FOR_ML
+from src.instrumentation import timed, incr
+
+
+def read_batch(path):
+    """
+    Rows of an intake file: .jsonl / .ndjson (one JSON object per line) or CSV.
+    Lines that are not valid JSON or not a JSON object are skipped and reported,
+    one bad line never stops the rest of the roster; bytes that are not UTF-8 are
+    replaced and a file that cannot be read at all gives a warning and no rows.
+    """
+    if not os.path.exists(path):
+        print(f"[WARN] Intake file not found: {path}")
+        return []
+    try:
+        return _read_rows(path)
+    except (OSError, csv.Error) as e:
+        # a directory, a permission problem, a broken CSV: the menu keeps running
+        print(f"[WARN] Could not read intake file {path}: {e}")
+        return []
+
+
+def _read_rows(path):
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        rows, malformed, not_objects = [], 0, 0
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    malformed += 1
+                    continue
+                if isinstance(row, dict):
+                    rows.append(row)
+                else:
+                    not_objects += 1
+        if malformed:
+            incr("bulk_malformed_lines", malformed)
+            print(f"[WARN] Skipped {malformed} line(s) that are not valid JSON in {path}")
+        if not_objects:
+            incr("bulk_rejected_rows", not_objects)
+            print(f"[WARN] Skipped {not_objects} line(s) that are not a JSON object in {path}")
+        return rows
+    return list(iter_csv(path, errors="replace"))
+
+
+@timed("bulk_admit")
+def bulk_admit(rows, nb_model=None, recovery_model=None, queue=None, patients=None,
+               stats=None, journal=None):
+    """
+    Admit a batch of raw rows. Returns the admitted patient dicts (with Priority,
+    Recovery_Time and ML_Priority set). Everything that is passed in (queue, patient
+    list/store, models, stats, journal) is updated once for the whole batch.
+    """
+    batch, rejected = [], 0
+    for r in rows:
+        if isinstance(r, dict):
+            batch.append(clean_record(r, typed=True))
+        else:
+            rejected += 1
+    if rejected:
+        incr("bulk_rejected_rows", rejected)
+        print(f"[WARN] Rejected {rejected} row(s) that are not records")
+    if not batch:
+        return []
+
+    priorities = assign_priority_batch(batch)
+
+    ml = [None] * len(batch)
+    if nb_model is not None and getattr(nb_model, "total", 0) >= MIN_SAMPLES_FOR_ML:
+        ml = nb_model.predict_many(batch)
+
+    recovery = [0.0] * len(batch)
+    if recovery_model is not None and recovery_model.n:
+        recovery = predict_many(recovery_model.to_model(), batch)
+
+    # only the recovery times the roster really has go into the regression, not predictions
+    recorded = [p for p in batch if p["Recovery_Time"] > 0]
+    for p, pr, ml_pr, rec in zip(batch, priorities, ml, recovery):
+        p["Priority"] = int(pr)
+        if not p["Recovery_Time"] > 0:  # keep a recovery time the roster already has
+            p["Recovery_Time"] = round(rec, 2)
+        p["ML_Priority"] = ml_pr
+
+    # merge into the live state: one heapify, one model update per model
+    if queue is not None:
+        queue.push_many(batch)
+    if patients is not None:
+        patients.extend(batch)
+    if nb_model is not None:
+        nb_model.partial_fit(batch)
+    if recovery_model is not None:
+        recovery_model.add_many(recorded)
+    if stats is not None:
+        for p in batch:
+            stats.add(p)
+    if journal is not None:
+        journal.append_many(batch)  # one write and one fsync for the whole roster
+
+    incr("bulk_admitted", len(batch))
+    return batch
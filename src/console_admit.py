@@ -1,7 +1,7 @@
 # this file is responsible for admitting patients directly into the in-memory list
 
 from .nb_priority import MIN_SAMPLES_FOR_ML
-from .regression import fit_linear_regression, predict_one
+from .regression import RecoveryRegression, RECOVERY_FEATURES, RECOVERY_TIME_UNIT, has_recovery_time
 
 def _ask_int(prompt, default=0):
     s = input(prompt).strip()
@@ -12,13 +12,23 @@ def _ask_int(prompt, default=0):
     except:
         return default
 
-def run_admission_session(assign_priority_fn, nb_train_fn=None, nb_predict_fn=None, patients=None):
+def run_admission_session(assign_priority_fn, nb_train_fn=None, nb_predict_fn=None, patients=None, queue=None, nb_model=None, recovery_model=None, journal=None):
     print("=" * 70)
     print(" ADMISSION DASHBOARD ".center(70, "="))
     print("=" * 70)
 
     new_patients = []
 
+    # train the NB model once per session (or reuse the dashboard's warm one) and
+    # update it with every admission instead of retraining on the whole history
+    if nb_model is None and patients and nb_train_fn and len(patients) >= MIN_SAMPLES_FOR_ML:
+        nb_model = nb_train_fn(patients)
+
+    # same idea for the recovery regression: X^T X / X^T y are accumulated once over the
+    # patients with a recorded recovery time (admissions here only get a predicted one)
+    if recovery_model is None and patients:
+        recovery_model = RecoveryRegression(RECOVERY_FEATURES).add_many(p for p in patients if has_recovery_time(p))
+
     while True:
         print("\nNew patient entry:")
         name = input("Name: ").strip().title() or "Unknown"
@@ -37,8 +47,7 @@ def run_admission_session(assign_priority_fn, nb_train_fn=None, nb_predict_fn=No
         })
 
         ml_priority = None
-        if patients and nb_train_fn and nb_predict_fn and len(patients) >= MIN_SAMPLES_FOR_ML:
-            nb_model = nb_train_fn(patients)
+        if nb_model is not None and nb_predict_fn and getattr(nb_model, "total", MIN_SAMPLES_FOR_ML) >= MIN_SAMPLES_FOR_ML:
             ml_priority = nb_predict_fn(nb_model, {
                 "Age": age, "Heart_Rate": hr, "Blood_Pressure": bp,
                 "Oxygen_Level": o2, "Consciousness": state, "Injury_Type": injury
@@ -46,10 +55,8 @@ def run_admission_session(assign_priority_fn, nb_train_fn=None, nb_predict_fn=No
 
         #recov pred
         recovery_time = 0.0
-        if patients:
-            features = ["Heart_Rate", "Age", "Blood_Pressure", "Oxygen_Level"]
-            reg_model = fit_linear_regression(patients, features)
-            recovery_time = round(predict_one(reg_model, {
+        if recovery_model is not None and recovery_model.n:
+            recovery_time = round(recovery_model.predict({
                 "Age": age, "Heart_Rate": hr, "Blood_Pressure": bp, "Oxygen_Level": o2
             }), 2)
 
@@ -58,7 +65,7 @@ def run_admission_session(assign_priority_fn, nb_train_fn=None, nb_predict_fn=No
         print("\n----------------------------")
         print(f"ML Predicted Priority: {ml_priority if ml_priority else 'N/A'}")
         print(f"Rule-based Priority:   {rule_priority}")
-        print(f"Predicted Recovery:    {recovery_time} days")
+        print(f"Predicted Recovery:    {recovery_time} {RECOVERY_TIME_UNIT}")
         print(f"Final Assigned:        {final_priority}")
         print("----------------------------")
 
@@ -74,9 +81,20 @@ def run_admission_session(assign_priority_fn, nb_train_fn=None, nb_predict_fn=No
             "Recovery_Time": recovery_time
         }
         new_patients.append(patient)
+        # durable right away: one appended line, not a rewrite of the whole CSV
+        if journal is not None:
+            journal.append(patient)
+        if hasattr(nb_model, "update"):
+            nb_model.update(patient)
+        # the recovery time above is predicted, so it is not fed back into the regression
+        # keep the live triage queue up to date instead of re-sorting later
+        if queue is not None:
+            queue.push(patient)
 
         again = input("Add another? (y/n): ").strip().lower()
         if again != "y":
+            if journal is not None:
+                journal.flush()
             print("\nSession complete. All patients stored in memory!\n")
             break
 
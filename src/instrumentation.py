@@ -0,0 +1,173 @@
+# lightweight timers, counters and histograms for the slow parts of the system
+# (loading, cleaning, model training, prediction, plotting...).
+#
+# it is off unless TRIAGE_METRICS=1 is set or enable() is called. While off, timed()
+# returns the function unchanged and timer() hands back one shared no-op object,
+# so the instrumented code pays nothing. dump_json() / dump_prometheus() export
+# everything that was recorded.
+import os
+import json
+import time
+import bisect
+import threading
+import functools
+
+# histogram bucket upper bounds, in seconds for timers
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+_enabled = os.environ.get("TRIAGE_METRICS", "").lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(b): c for b, c in zip(list(self.buckets) + ["+Inf"], self.counts)},
+        }
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def incr(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS):
+    if not _enabled:
+        return
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram(buckets)
+        h.observe(value)
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name + "_seconds", time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """`with timer("stage"):` records the duration in the histogram stage_seconds."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name):
+    """Decorator version of timer(). Returns the function untouched when metrics are off at import."""
+    def wrap(fn):
+        if not _enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name + "_seconds", time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {k: h.to_dict() for k, h in _histograms.items()},
+        }
+
+
+def dump_json(path=None):
+    """Return the metrics as JSON text, and write them to path if given."""
+    text = json.dumps(snapshot(), indent=2, sort_keys=True)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
+
+
+def _metric_name(name):
+    return "triage_" + "".join(ch if ch.isalnum() else "_" for ch in name)
+
+
+def dump_prometheus(path=None):
+    """Return the metrics in the Prometheus text exposition format (and write them to path)."""
+    snap = snapshot()
+    lines = []
+    for name, value in sorted(snap["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, h in sorted(snap["histograms"].items()):
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in h["buckets"].items():
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum {h['sum']}")
+        lines.append(f"{metric}_count {h['count']}")
+    text = "\n".join(lines) + "\n"
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    return text
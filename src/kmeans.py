@@ -1,4 +1,13 @@
 # here we did the k-means clustering for k=3
+import random
+
+from src.instrumentation import timed
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, kmeans_fit falls back to plain Python
+    np = None
+
 
 def euclidean_distance(p1, p2):
     return ((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2) ** 0.5
@@ -12,6 +21,7 @@ def compute_centroid(points):
     return (x, y)
 
 
+@timed("kmeans")
 def kmeans(points, k=3, max_iter=100):
     centroids = points[:k]
     for _ in range(max_iter):
@@ -29,3 +39,203 @@ def kmeans(points, k=3, max_iter=100):
         centroids = new_centroids
 
     return centroids, clusters
+
+
+# ---------------------------------------------------------------------------
+# faster engine: k-means++ seeding, a movement tolerance instead of exact equality,
+# several restarts (best inertia wins) and a mini-batch mode for very large inputs.
+# it returns one label per point instead of lists of point tuples.
+
+MINIBATCH_THRESHOLD = 200000  # above this many points kmeans_fit switches to mini-batch
+
+
+def _kmeans_pp_np(X, k, rng):
+    n = X.shape[0]
+    centroids = [X[rng.integers(n)]]
+    d2 = ((X - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = d2.sum()
+        idx = rng.choice(n, p=d2 / total) if total > 0 else rng.integers(n)
+        centroids.append(X[idx])
+        d2 = np.minimum(d2, ((X - X[idx]) ** 2).sum(axis=1))
+    return np.array(centroids, dtype=float)
+
+
+def _sq_dists_np(X, C):
+    # |x|^2 - 2 x.c + |c|^2, one matrix product for all points and centroids
+    return (X * X).sum(axis=1)[:, None] - 2.0 * X @ C.T + (C * C).sum(axis=1)[None, :]
+
+
+def _lloyd_np(X, C, max_iter, tol):
+    for _ in range(max_iter):
+        labels = _sq_dists_np(X, C).argmin(axis=1)
+        sums = np.zeros_like(C)
+        np.add.at(sums, labels, X)
+        counts = np.bincount(labels, minlength=C.shape[0]).astype(float)
+        new_C = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], C)
+        shift = ((new_C - C) ** 2).sum()
+        C = new_C
+        if shift <= tol:
+            break
+    d = _sq_dists_np(X, C)
+    labels = d.argmin(axis=1)
+    inertia = float(np.maximum(d[np.arange(X.shape[0]), labels], 0).sum())
+    return C, labels, inertia
+
+
+def _minibatch_np(X, C, max_iter, tol, batch_size, rng):
+    counts = np.zeros(C.shape[0])
+    for _ in range(max_iter):
+        batch = X[rng.integers(0, X.shape[0], size=batch_size)]
+        labels = _sq_dists_np(batch, C).argmin(axis=1)
+        old = C.copy()
+        for j in np.unique(labels):
+            pts = batch[labels == j]
+            counts[j] += len(pts)
+            # per-centroid learning rate 1/count (Sculley's mini-batch k-means)
+            C[j] += (pts.sum(axis=0) - len(pts) * C[j]) / counts[j]
+        if ((C - old) ** 2).sum() <= tol:
+            break
+    d = _sq_dists_np(X, C)
+    labels = d.argmin(axis=1)
+    inertia = float(np.maximum(d[np.arange(X.shape[0]), labels], 0).sum())
+    return C, labels, inertia
+
+
+def _sq_dist(p, c):
+    return (p[0] - c[0]) ** 2 + (p[1] - c[1]) ** 2
+
+
+def _kmeans_pp(points, k, rng):
+    centroids = [points[rng.randrange(len(points))]]
+    d2 = [_sq_dist(p, centroids[0]) for p in points]
+    for _ in range(1, k):
+        total = sum(d2)
+        if total > 0:
+            idx = rng.choices(range(len(points)), weights=d2)[0]
+        else:
+            idx = rng.randrange(len(points))
+        c = points[idx]
+        centroids.append(c)
+        d2 = [min(d, _sq_dist(p, c)) for d, p in zip(d2, points)]
+    return [tuple(c) for c in centroids]
+
+
+def _assign(points, centroids):
+    labels, inertia = [], 0.0
+    for p in points:
+        best, best_d = 0, _sq_dist(p, centroids[0])
+        for j in range(1, len(centroids)):
+            d = _sq_dist(p, centroids[j])
+            if d < best_d:
+                best, best_d = j, d
+        labels.append(best)
+        inertia += best_d
+    return labels, inertia
+
+
+def _lloyd(points, centroids, max_iter, tol):
+    k = len(centroids)
+    for _ in range(max_iter):
+        labels, _ = _assign(points, centroids)
+        sx, sy, n = [0.0] * k, [0.0] * k, [0] * k
+        for p, j in zip(points, labels):
+            sx[j] += p[0]
+            sy[j] += p[1]
+            n[j] += 1
+        new_centroids = [(sx[j] / n[j], sy[j] / n[j]) if n[j] else centroids[j] for j in range(k)]
+        shift = sum(_sq_dist(a, b) for a, b in zip(new_centroids, centroids))
+        centroids = new_centroids
+        if shift <= tol:
+            break
+    labels, inertia = _assign(points, centroids)
+    return centroids, labels, inertia
+
+
+def _minibatch(points, centroids, max_iter, tol, batch_size, rng):
+    centroids = [list(c) for c in centroids]
+    counts = [0] * len(centroids)
+    for _ in range(max_iter):
+        batch = [points[rng.randrange(len(points))] for _ in range(batch_size)]
+        labels, _ = _assign(batch, centroids)
+        old = [tuple(c) for c in centroids]
+        for p, j in zip(batch, labels):
+            counts[j] += 1
+            eta = 1.0 / counts[j]
+            centroids[j][0] += eta * (p[0] - centroids[j][0])
+            centroids[j][1] += eta * (p[1] - centroids[j][1])
+        if sum(_sq_dist(a, b) for a, b in zip(centroids, old)) <= tol:
+            break
+    centroids = [tuple(c) for c in centroids]
+    labels, inertia = _assign(points, centroids)
+    return centroids, labels, inertia
+
+
+@timed("kmeans_fit")
+def kmeans_fit(points, k=3, n_init=4, max_iter=100, tol=1e-4, batch_size=None, seed=None):
+    """
+    Cluster 2-D points. Returns (centroids, labels, inertia) where labels[i] is the
+    cluster of points[i]. batch_size turns on mini-batch updates (automatic above
+    MINIBATCH_THRESHOLD points). Uses NumPy when it is installed.
+    """
+    n = len(points)
+    if n == 0:
+        return [], [], 0.0
+    k = min(k, n)
+    if batch_size is None and n > MINIBATCH_THRESHOLD:
+        batch_size = 4096
+
+    if np is not None:
+        X = np.asarray(points, dtype=float).reshape(n, -1)
+        rng = np.random.default_rng(seed)
+        best = None
+        for _ in range(n_init):
+            C = _kmeans_pp_np(X if n <= MINIBATCH_THRESHOLD else X[rng.integers(0, n, 20000)], k, rng)
+            if batch_size:
+                res = _minibatch_np(X, C, max_iter, tol, batch_size, rng)
+            else:
+                res = _lloyd_np(X, C, max_iter, tol)
+            if best is None or res[2] < best[2]:
+                best = res
+        C, labels, inertia = best
+        return [tuple(c) for c in C.tolist()], labels, inertia
+
+    rng = random.Random(seed)
+    points = [tuple(p) for p in points]
+    best = None
+    for _ in range(n_init):
+        seeds = points if n <= MINIBATCH_THRESHOLD else rng.sample(points, 20000)
+        C = _kmeans_pp(seeds, k, rng)
+        if batch_size:
+            res = _minibatch(points, C, max_iter, tol, batch_size, rng)
+        else:
+            res = _lloyd(points, C, max_iter, tol)
+        if best is None or res[2] < best[2]:
+            best = res
+    return best
+
+
+def points_from_columns(xs, ys):
+    """2-D points from two typed columns: an (n, 2) array that shares nothing with Python
+    objects when NumPy is installed, a list of tuples otherwise."""
+    if np is not None:
+        return np.column_stack((np.frombuffer(xs, dtype=float), np.frombuffer(ys, dtype=float)))
+    return list(zip(xs, ys))
+
+
+def cluster_sizes(labels, k):
+    """Number of points in each of the k clusters."""
+    if np is not None:
+        return np.bincount(np.asarray(labels, dtype=np.intp), minlength=k).tolist()
+    sizes = [0] * k
+    for j in labels:
+        sizes[int(j)] += 1
+    return sizes
+
+
+def group_by_label(points, labels, k):
+    """Turn (points, labels) back into the list-of-clusters shape that kmeans returns."""
+    clusters = [[] for _ in range(k)]
+    for p, j in zip(points, labels):
+        clusters[int(j)].append(tuple(p))
+    return clusters
@@ -0,0 +1,123 @@
+# trained models kept on disk between runs (dataset/models.json), so a launch does not
+# retrain the NB priority model and the recovery regression from scratch.
+#
+# the cache is keyed by a fingerprint of the training rows and the feature lists. The
+# fingerprint is the sum of one 64-bit hash per row (mod 2^64): it does not depend on the
+# row order, and an admission only adds its own row hash instead of rehashing everything.
+# both models are plain counts / sufficient statistics, so after admissions they are
+# updated in place and saved again together with the new fingerprint.
+import os
+import json
+import hashlib
+
+from src.admissions_io import DATA_DIR
+from src.instrumentation import timed, incr
+from src.nb_priority import FEATURES, NB_MODE, nb_from_state, nb_train
+from src.regression import RecoveryRegression, RECOVERY_FEATURES, has_recovery_time
+
+MODEL_CACHE_PATH = os.path.join(DATA_DIR, "models.json")
+CACHE_VERSION = 2  # 2: the regression is only trained on recorded recovery times
+
+# the fields either model reads from a patient
+ROW_NUMERIC = ["Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level", "Priority", "Recovery_Time"]
+ROW_TEXT = ["Consciousness", "Injury_Type"]
+_MASK = (1 << 64) - 1
+
+
+def _num(value):
+    try:
+        return repr(float(value))
+    except Exception:
+        return "0.0"
+
+
+def row_hash(p):
+    """64-bit hash of the values the models are trained on."""
+    key = "|".join([_num(p.get(f, 0)) for f in ROW_NUMERIC] +
+                   [str(p.get(f, "")).strip().lower() for f in ROW_TEXT])
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DataFingerprint:
+    def __init__(self, features):
+        self.features = list(features)
+        self.count = 0
+        self.digest = 0
+
+    def add(self, patient):
+        self.digest = (self.digest + row_hash(patient)) & _MASK
+        self.count += 1
+        return self
+
+    def add_many(self, patients):
+        for p in patients:
+            self.add(p)
+        return self
+
+    def to_dict(self):
+        return {"features": self.features, "count": self.count, "digest": f"{self.digest:016x}"}
+
+
+class ModelCache:
+    """
+    Loads the NB and recovery models when the cached fingerprint matches the patients,
+    otherwise trains them and writes the cache. Call add_many() with every admitted
+    patient (the models are updated by the caller) and save() to persist them.
+    """
+
+    def __init__(self, recovery_features=RECOVERY_FEATURES, path=MODEL_CACHE_PATH):
+        self.path = path
+        self.recovery_features = list(recovery_features)
+        self.fingerprint = DataFingerprint(["nb_mode:" + NB_MODE] + ["nb:" + f for f in FEATURES] +
+                                           ["recovery:" + f for f in self.recovery_features])
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CACHE_VERSION or data.get("fingerprint") != self.fingerprint.to_dict():
+            return None
+        return data
+
+    @timed("model_cache_load")
+    def load_or_train(self, patients):
+        """Return (nb_model, recovery_model) for these patients."""
+        self.fingerprint = DataFingerprint(self.fingerprint.features).add_many(patients)
+        data = self._read()
+        if data is not None:
+            try:
+                nb_model = nb_from_state(data["nb"]) if data["nb"] else None
+                recovery_model = RecoveryRegression.from_state(data["recovery"])
+                incr("model_cache_hits")
+                print(f"[LOAD] Models for {self.fingerprint.count} patients loaded from {self.path}")
+                return nb_model, recovery_model
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        incr("model_cache_misses")
+        nb_model = nb_train(patients)
+        recovery_model = RecoveryRegression(self.recovery_features).add_many(
+            p for p in patients if has_recovery_time(p))
+        self.save(nb_model, recovery_model)
+        return nb_model, recovery_model
+
+    def add(self, patient):
+        self.fingerprint.add(patient)
+
+    def add_many(self, patients):
+        self.fingerprint.add_many(patients)
+
+    def save(self, nb_model, recovery_model):
+        data = {
+            "version": CACHE_VERSION,
+            "fingerprint": self.fingerprint.to_dict(),
+            "nb": nb_model.to_state() if nb_model is not None else None,
+            "recovery": recovery_model.to_state(),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
@@ -1,8 +1,20 @@
 #in this file we compute the "Naive Bayes" to predict the priority level that may be assigned 
 # for a patient based on the attributes entered by the user
+import os
 import math
+import bisect
+from array import array
+
+from src.instrumentation import timed
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, nb_predict_many falls back to plain Python
+    np = None
 
 MIN_SAMPLES_FOR_ML = 10  # min needed samples to start the prediction
+# "counts" = NBModel below, "binned" / "quantile" / "gaussian" = CompactNBModel
+NB_MODE = os.environ.get("TRIAGE_NB_MODE", "counts")
 
 #below the functions converts the patient's record into numeric or text features to ensure safety 
 def encode_features(p):
@@ -36,35 +48,474 @@ def encode_features(p):
     }
 
 
-def nb_train(patients):
-    if not patients:
-        return None
+FEATURES = ["age", "heart", "bp", "o2", "injury", "state"]
+
+
+def _bump(counts, key, delta):
+    # zero counts are dropped so a removed patient leaves no trace in the smoothing
+    n = counts.get(key, 0) + delta
+    if n:
+        counts[key] = n
+    else:
+        counts.pop(key, None)
+
+
+# the model keeps the raw counts plus the running totals that nb_predict needs, so
+# adding one more patient only touches a handful of counters instead of retraining
+class NBModel:
+    def __init__(self):
+        self.class_counts = {}
+        self.like_counts = {}    # feature -> class -> value -> count
+        self.like_totals = {}    # feature -> class -> total count
+        self.total = 0
+        self._tables = None      # cached log tables, see _log_tables
+
+    def update(self, patient):
+        """Add one labelled patient to the counts in O(features)."""
+        return self._count(patient, 1)
+
+    def remove(self, patient):
+        """Take back a patient that was added before (same values and priority)."""
+        return self._count(patient, -1)
+
+    def _count(self, patient, sign):
+        try:
+            f = encode_features(patient)
+            c = int(float(patient.get("Priority", 0)))
+        except Exception:
+            return self
+
+        _bump(self.class_counts, c, sign)
+        self.total += sign
+
+        for fname in FEATURES:
+            per_class = self.like_counts.setdefault(fname, {})
+            _bump(per_class.setdefault(c, {}), f[fname], sign)
+            if not per_class[c]:
+                del per_class[c]
+            _bump(self.like_totals.setdefault(fname, {}), c, sign)
+        self._patch_tables(f, c)
+        return self
+
+    def _patch_tables(self, f, c):
+        # one patient only changes the priors, and per feature one numerator and the
+        # denominator of its class, so the cached tables are patched instead of rebuilt
+        if self._tables is None:
+            return
+        classes, priors, features = self._tables
+        if c not in classes or c not in self.class_counts or self.total <= 0:
+            self._tables = None  # a class appeared or vanished: rebuild on the next predict
+            return
+        log_total = math.log(self.total)
+        priors[:] = [math.log(self.class_counts[k]) - log_total for k in classes]
+        i = classes.index(c)
+        for fname in FEATURES:
+            counts = self.like_counts.get(fname, {}).get(c, {})
+            nums, v = features[fname][i][0], f[fname]
+            if v in counts:
+                nums[v] = math.log(counts[v] + 1)
+            else:
+                nums.pop(v, None)
+            denom = (self.like_totals.get(fname, {}).get(c, 0) or 1) + len(counts) + 1
+            features[fname][i][1] = math.log(denom)
+
+    def partial_fit(self, patients):
+        """Add a batch of labelled patients."""
+        for p in patients:
+            self.update(p)
+        return self
 
-    class_counts = {}
-    like_counts = {}
-    features = ["age", "heart", "bp", "o2", "injury", "state"]
+    def merge(self, other):
+        """Add the counts of a model trained on other patients (same result as training on both)."""
+        for c, n in other.class_counts.items():
+            _bump(self.class_counts, c, n)
+        self.total += other.total
+        self._tables = None
+        for fname, per_class in other.like_counts.items():
+            mine = self.like_counts.setdefault(fname, {})
+            for c, counts in per_class.items():
+                target = mine.setdefault(c, {})
+                for v, n in counts.items():
+                    _bump(target, v, n)
+        for fname, totals in other.like_totals.items():
+            mine = self.like_totals.setdefault(fname, {})
+            for c, n in totals.items():
+                _bump(mine, c, n)
+        return self
 
+    def _log_tables(self):
+        # log priors plus, per feature and class, [value -> log(count + 1), log(denominator)];
+        # a likelihood is numerator - denominator (an unseen value has numerator 0).
+        # Built once, then patched by update() / remove().
+        if self._tables is None:
+            classes = list(self.class_counts)
+            priors = [math.log(self.class_counts[c] / self.total) for c in classes]
+            features = {}
+            for fname in FEATURES:
+                per_class = []
+                for c in classes:
+                    counts = self.like_counts.get(fname, {}).get(c, {})
+                    denom = (self.like_totals.get(fname, {}).get(c, 0) or 1) + len(counts) + 1
+                    per_class.append([{v: math.log(n + 1) for v, n in counts.items()}, math.log(denom)])
+                features[fname] = per_class
+            self._tables = (classes, priors, features)
+        return self._tables
+
+    def log_priors(self):
+        classes, priors, _ = self._log_tables()
+        return classes, priors
+
+    def feature_log_probs(self, fname, values):
+        """Per class, the log likelihood of each of the given feature values."""
+        return [[nums.get(v, 0.0) - log_denom for v in values] for nums, log_denom in self._log_tables()[2][fname]]
+
+    def predict(self, patient):
+        if not patient or self.total == 0:
+            return None
+        return _predict_encoded(self, encode_features(patient))
+
+    def predict_many(self, patients):
+        return nb_predict_many(self, patients)
+
+    def to_dict(self):
+        return {"class_counts": self.class_counts, "like_counts": self.like_counts}
+
+    def to_state(self):
+        """JSON-safe counts; values are kept as [value, count] pairs so int keys stay ints."""
+        return {
+            "total": self.total,
+            "class_counts": [[c, n] for c, n in self.class_counts.items()],
+            "like_counts": {
+                fname: [[c, [[v, n] for v, n in counts.items()]] for c, counts in per_class.items()]
+                for fname, per_class in self.like_counts.items()
+            },
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        model = cls()
+        model.total = state["total"]
+        model.class_counts = {c: n for c, n in state["class_counts"]}
+        for fname, per_class in state["like_counts"].items():
+            model.like_counts[fname] = {c: {v: n for v, n in counts} for c, counts in per_class}
+            model.like_totals[fname] = {c: sum(n for _, n in counts) for c, counts in per_class}
+        return model
+
+
+# ---------------------------------------------------------------------------
+# compact mode: the vitals are bucketed (or modelled as one Gaussian per class) and
+# injury / state are categorical over a fixed vocabulary, so every likelihood table is
+# a flat array of n_classes * n_values counts. Memory stays the same however many
+# patients are added, and a prediction is a few array lookups per class.
+
+CLASSES = (1, 2, 3, 4)
+NUMERIC_FEATURES = ["age", "heart", "bp", "o2"]
+CATEGORY_VALUES = {
+    "injury": ["bleeding", "burn", "fracture", "minor", "none"],
+    "state": ["conscious", "unconscious"],
+}  # anything else falls in one extra "other" slot
+# fixed bucket edges for "binned" mode, around the thresholds the triage rules use
+DEFAULT_BIN_EDGES = {
+    "age": [18, 40, 65, 80],
+    "heart": [50, 60, 100, 120, 140],
+    "bp": [80, 90, 120, 140, 180],
+    "o2": [85, 90, 94, 97],
+}
+QUANTILE_BINS = 8
+MIN_VARIANCE = 1.0  # floor for the Gaussian variances (vitals are whole numbers)
+
+
+def quantile_edges(patients, n_bins=QUANTILE_BINS):
+    """Bucket edges that split the training vitals into n_bins equally filled bins."""
+    values = {f: [] for f in NUMERIC_FEATURES}
     for p in patients:
+        f = encode_features(p)
+        for fname in NUMERIC_FEATURES:
+            values[fname].append(f[fname])
+    edges = {}
+    for fname, vals in values.items():
+        vals.sort()
+        cuts = [vals[len(vals) * i // n_bins] for i in range(1, n_bins)] if vals else []
+        edges[fname] = sorted(set(cuts))
+    return edges
+
+
+class CompactNBModel:
+    def __init__(self, mode="binned", edges=None):
+        if mode not in ("binned", "quantile", "gaussian"):
+            raise ValueError(f"Unknown NB mode: {mode}")
+        self.mode = mode
+        self.edges = {f: list(e) for f, e in (edges or DEFAULT_BIN_EDGES).items()}
+        self._index = {c: i for i, c in enumerate(CLASSES)}
+        self._slots = {f: {v: i for i, v in enumerate(vals)} for f, vals in CATEGORY_VALUES.items()}
+        k = len(CLASSES)
+        self.class_counts = array("d", [0.0] * k)
+        self.total = 0
+        self._tables = None
+        # feature -> flat table, row c holds the counts of class CLASSES[c]
+        self.tables = {f: array("d", [0.0] * (k * (len(vals) + 1))) for f, vals in CATEGORY_VALUES.items()}
+        if mode == "gaussian":
+            # per class: sum and sum of squares
+            self.moments = {f: array("d", [0.0] * (2 * k)) for f in NUMERIC_FEATURES}
+        else:
+            self.moments = {}
+            for fname in NUMERIC_FEATURES:
+                self.tables[fname] = array("d", [0.0] * (k * (len(self.edges[fname]) + 1)))
+
+    def _width(self, fname):
+        return len(self.tables[fname]) // len(CLASSES)
+
+    def _slot(self, fname, value):
+        if fname in self._slots:
+            return self._slots[fname].get(value, len(CATEGORY_VALUES[fname]))
+        return bisect.bisect_right(self.edges[fname], value)
+
+    def update(self, patient):
+        return self._count(patient, 1)
+
+    def remove(self, patient):
+        return self._count(patient, -1)
+
+    def _count(self, patient, sign):
         try:
-            f = encode_features(p)
-            c = int(float(p.get("Priority", 0)))
+            f = encode_features(patient)
+            ci = self._index[int(float(patient.get("Priority", 0)))]
         except Exception:
+            return self
+
+        self.class_counts[ci] += sign
+        self.total += sign
+        slots = {}
+        for fname, table in self.tables.items():
+            slots[fname] = self._slot(fname, f[fname])
+            table[ci * self._width(fname) + slots[fname]] += sign
+        for fname, m in self.moments.items():
+            x = f[fname]
+            m[2 * ci] += sign * x
+            m[2 * ci + 1] += sign * x * x
+        self._patch_tables(ci, slots)
+        return self
+
+    def _patch_tables(self, ci, slots):
+        # only class ci changed: refresh the priors, its denominators, the touched
+        # slot of every table and its Gaussian parameters
+        if self._tables is None:
+            return
+        classes, priors, logs, gauss = self._tables
+        if CLASSES[ci] not in classes or not self.class_counts[ci]:
+            self._tables = None  # a class appeared or vanished: rebuild on the next predict
+            return
+        log_total = math.log(self.total)
+        priors[:] = [math.log(self.class_counts[self._index[c]]) - log_total for c in classes]
+        row = classes.index(CLASSES[ci])
+        for fname, s in slots.items():
+            width = self._width(fname)
+            entry = logs[fname][row]
+            entry[0][s] = math.log(self.tables[fname][ci * width + s] + 1)
+            entry[1] = math.log(self.class_counts[ci] + width)
+        for fname in self.moments:
+            gauss[fname][row] = self._gaussian(fname, ci)
+
+    def _gaussian(self, fname, i):
+        m, n_c = self.moments[fname], self.class_counts[i]
+        mean = m[2 * i] / n_c
+        var = max(m[2 * i + 1] / n_c - mean * mean, MIN_VARIANCE)
+        return mean, 2 * var, -0.5 * math.log(2 * math.pi * var)
+
+    def partial_fit(self, patients):
+        for p in patients:
+            self.update(p)
+        return self
+
+    def merge(self, other):
+        """Add the tables of a model with the same mode and bucket edges."""
+        if other.mode != self.mode or other.edges != self.edges:
+            raise ValueError("Cannot merge NB models with different modes or bucket edges")
+        for i, n in enumerate(other.class_counts):
+            self.class_counts[i] += n
+        self.total += other.total
+        self._tables = None
+        for group, theirs in ((self.tables, other.tables), (self.moments, other.moments)):
+            for fname, arr in group.items():
+                for i, v in enumerate(theirs[fname]):
+                    arr[i] += v
+        return self
+
+    def _log_tables(self):
+        if self._tables is None:
+            seen = [i for i, n in enumerate(self.class_counts) if n]
+            classes = [CLASSES[i] for i in seen]
+            priors = [math.log(self.class_counts[i] / self.total) for i in seen]
+            logs, gauss = {}, {}
+            for fname, table in self.tables.items():
+                width = self._width(fname)
+                # Laplace smoothing over the fixed number of slots, per class
+                # [log(count + 1) per slot, log(denominator)]
+                logs[fname] = [[[math.log(table[i * width + s] + 1) for s in range(width)],
+                                math.log(self.class_counts[i] + width)] for i in seen]
+            for fname in self.moments:
+                gauss[fname] = [self._gaussian(fname, i) for i in seen]
+            self._tables = (classes, priors, logs, gauss)
+        return self._tables
+
+    def log_priors(self):
+        classes, priors, _, _ = self._log_tables()
+        return classes, priors
+
+    def feature_log_probs(self, fname, values):
+        _, _, logs, gauss = self._log_tables()
+        if fname in logs:
+            slots = [self._slot(fname, v) for v in values]
+            return [[nums[s] - log_denom for s in slots] for nums, log_denom in logs[fname]]
+        return [[const - (v - mean) ** 2 / two_var for v in values] for mean, two_var, const in gauss[fname]]
+
+    def predict(self, patient):
+        if not patient or self.total == 0:
+            return None
+        return _predict_encoded(self, encode_features(patient))
+
+    def predict_many(self, patients):
+        return nb_predict_many(self, patients)
+
+    def to_state(self):
+        return {
+            "mode": self.mode,
+            "edges": self.edges,
+            "total": self.total,
+            "class_counts": list(self.class_counts),
+            "tables": {f: list(t) for f, t in self.tables.items()},
+            "moments": {f: list(m) for f, m in self.moments.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        model = cls(state["mode"], state["edges"])
+        model.total = state["total"]
+        model.class_counts = array("d", state["class_counts"])
+        model.tables = {f: array("d", t) for f, t in state["tables"].items()}
+        model.moments = {f: array("d", m) for f, m in state["moments"].items()}
+        return model
+
+
+# ---------------------------------------------------------------------------
+# scoring with the precomputed tables. Both models expose log_priors() and
+# feature_log_probs(fname, values); a batch is scored by looking up each distinct
+# feature value once and gathering the results for every patient.
+
+_STORE_NUMERIC = {"age": "Age", "heart": "Heart_Rate", "bp": "Blood_Pressure", "o2": "Oxygen_Level"}
+_STORE_TEXT = {"injury": "Injury_Type", "state": "Consciousness"}
+
+
+def _predict_encoded(model, f):
+    classes, priors = model.log_priors()
+    scores = list(priors)
+    for fname in FEATURES:
+        for i, lp in enumerate(model.feature_log_probs(fname, [f[fname]])):
+            scores[i] += lp[0]
+    best = None
+    for i, lp in enumerate(scores):
+        if best is None or lp > scores[best]:
+            best = i
+    return classes[best] if best is not None else None
+
+
+def _factorize(values):
+    """(distinct values, index of each value in that list)."""
+    index = {}
+    inverse = [index.setdefault(v, len(index)) for v in values]
+    return list(index), (np.asarray(inverse, dtype=np.intp) if np is not None else inverse)
+
+
+def _encoded_columns(patients):
+    """feature -> (distinct encoded values, per-patient index into them)."""
+    if hasattr(patients, "column"):
+        # PatientStore: vitals straight from the columns, text from the category codes
+        cols = {}
+        for fname, field in _STORE_NUMERIC.items():
+            if np is not None:
+                uniq, inv = np.unique(np.asarray(patients.column(field)).astype(np.int64), return_inverse=True)
+                cols[fname] = (uniq.tolist(), inv)
+            else:
+                cols[fname] = _factorize(int(v) for v in patients.column(field))
+        for fname, field in _STORE_TEXT.items():
+            uniq = [str(c).strip().lower() for c in patients.categories(field)]
+            codes = patients.codes(field)
+            cols[fname] = (uniq, np.asarray(codes, dtype=np.intp) if np is not None else list(codes))
+        return cols
+    encoded = [encode_features(p) for p in patients]
+    return {fname: _factorize([e[fname] for e in encoded]) for fname in FEATURES}
+
+
+@timed("nb_predict_many")
+def nb_predict_many(model, patients, return_proba=False):
+    """
+    Predict a whole batch. Returns one class per patient, or with return_proba=True one
+    {class: probability} dict per patient. Works with NBModel and CompactNBModel.
+    """
+    if not hasattr(patients, "__len__"):
+        patients = list(patients)
+    n = len(patients)
+    if not model or model.total == 0 or n == 0:
+        return [None] * n
+    classes, priors = model.log_priors()
+    cols = _encoded_columns(patients)
+
+    if np is not None:
+        scores = np.empty((len(classes), n))
+        scores[:] = np.asarray(priors)[:, None]
+        for fname in FEATURES:
+            uniq, inv = cols[fname]
+            scores += np.asarray(model.feature_log_probs(fname, uniq))[:, inv]
+        if not return_proba:
+            return [classes[i] for i in scores.argmax(axis=0).tolist()]
+        probs = np.exp(scores - scores.max(axis=0))
+        probs /= probs.sum(axis=0)
+        return [dict(zip(classes, col)) for col in probs.T.tolist()]
+
+    scores = [[p] * n for p in priors]
+    for fname in FEATURES:
+        uniq, inv = cols[fname]
+        for row, lps in zip(scores, model.feature_log_probs(fname, uniq)):
+            for j, u in enumerate(inv):
+                row[j] += lps[u]
+    out = []
+    for j in range(n):
+        col = [row[j] for row in scores]
+        if not return_proba:
+            out.append(classes[col.index(max(col))])
             continue
+        top = max(col)
+        exps = [math.exp(v - top) for v in col]
+        total = sum(exps)
+        out.append({c: e / total for c, e in zip(classes, exps)})
+    return out
 
-        class_counts[c] = class_counts.get(c, 0) + 1
 
-        for fname in features:
-            val = f[fname]
-            like_counts.setdefault(fname, {})
-            like_counts[fname].setdefault(c, {})
-            like_counts[fname][c][val] = like_counts[fname][c].get(val, 0) + 1
+def nb_from_state(state):
+    """Rebuild whichever NB model to_state() came from."""
+    if state.get("mode", "counts") == "counts":
+        return NBModel.from_state(state)
+    return CompactNBModel.from_state(state)
+
 
-    return {"class_counts": class_counts, "like_counts": like_counts}
+@timed("nb_train")
+def nb_train(patients, mode=None):
+    """mode defaults to NB_MODE (env TRIAGE_NB_MODE): counts, binned, quantile or gaussian."""
+    if not patients:
+        return None
+    mode = mode or NB_MODE
+    if mode == "counts":
+        return NBModel().partial_fit(patients)
+    edges = quantile_edges(patients) if mode == "quantile" else None
+    return CompactNBModel(mode, edges).partial_fit(patients)
 
 #here's where we predict the priority using the trained model we did above
+@timed("nb_predict")
 def nb_predict(model, patient):
     if not model or not patient:
         return None
+    if isinstance(model, (NBModel, CompactNBModel)):
+        return model.predict(patient)
 
     f = encode_features(patient)
     features = list(f.keys())
@@ -0,0 +1,67 @@
+# page-by-page views for the dashboard tables.
+# a page is found by partial selection, never by sorting everything: the live queue is
+# walked best-first over its heap (TriageQueue.page) and plain lists go through
+# heapq.nsmallest / nlargest. Pages are addressed by cursors (the sort key of the first /
+# last row shown) instead of offsets, so paging stays correct while patients are admitted
+# or taken out of the queue between two pages.
+import heapq
+
+from src.queue_manager import _priority_of
+
+PAGE_SIZE = 20
+
+
+def priority_key(patient):
+    """Sort key for page_list that matches the queue order (ties stay in list order)."""
+    return _priority_of(patient)
+
+
+class Page:
+    __slots__ = ("items", "first", "last", "has_prev", "has_next")
+
+    def __init__(self, items, first=None, last=None, has_prev=False, has_next=False):
+        self.items = items          # [(id, patient), ...]
+        self.first = first          # cursor of the first row, pass as before= for the previous page
+        self.last = last            # cursor of the last row, pass as after= for the next page
+        self.has_prev = has_prev
+        self.has_next = has_next
+
+    def patients(self):
+        return [p for _, p in self.items]
+
+
+def page_list(items, size=PAGE_SIZE, key=None, after=None, before=None):
+    """
+    One page of a list. Without key the rows keep their list order and the cursor is
+    the position; with key they are ordered by (key(item), position) and only the
+    page_size rows around the cursor are selected, in O(n log page_size).
+    """
+    n = len(items)
+    if key is None:
+        if before is not None:
+            end = min(before, n)
+            start = max(0, end - size)
+        else:
+            start = 0 if after is None else after + 1
+            end = min(start + size, n)
+        rows = [(i, i, items[i]) for i in range(start, end)] if end > start else []
+        return Page([(i, p) for _, i, p in rows],
+                    first=rows[0][0] if rows else None, last=rows[-1][0] if rows else None,
+                    has_prev=start > 0, has_next=end < n)
+
+    keyed = ((key(p), i, p) for i, p in enumerate(items))
+    if before is not None:
+        picked = heapq.nlargest(size + 1, (r for r in keyed if (r[0], r[1]) < before))
+        picked.reverse()
+        has_prev = len(picked) > size
+        rows = picked[-size:]
+        has_next = True
+    else:
+        picked = heapq.nsmallest(size + 1, (r for r in keyed if after is None or (r[0], r[1]) > after))
+        has_next = len(picked) > size
+        rows = picked[:size]
+        has_prev = after is not None
+    return Page([(i, p) for _, i, p in rows],
+                first=(rows[0][0], rows[0][1]) if rows else None,
+                last=(rows[-1][0], rows[-1][1]) if rows else None,
+                has_prev=has_prev, has_next=has_next)
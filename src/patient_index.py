@@ -0,0 +1,169 @@
+# secondary indexes over the in-memory patients, so filters do not scan the whole list.
+#  - hash indexes (value -> set of ids) on Injury_Type, Consciousness and Priority
+#  - sorted indexes (list of (value, id)) on Heart_Rate, Oxygen_Level, Blood_Pressure and Age
+# they are updated as patients are added/removed. A query starts from the most selective
+# condition (smallest id set or smallest value range) and only checks the other conditions
+# on those candidates, e.g. "unconscious patients with O2 < 85":
+#   index.query(consciousness="Unconscious", ranges={"Oxygen_Level": (None, 85)})
+import bisect
+
+RANGE_FIELDS = ["Heart_Rate", "Oxygen_Level", "Blood_Pressure", "Age"]
+
+
+def _text_key(value):
+    return str(value).strip().capitalize()
+
+
+def _priority_key(value):
+    try:
+        return int(float(value))
+    except Exception:
+        return 0
+
+
+def _number(value):
+    try:
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+# field -> function that turns a patient's value into the index key
+HASH_FIELDS = {
+    "Injury_Type": _text_key,
+    "Consciousness": _text_key,
+    "Priority": _priority_key,
+}
+# query() keyword -> field
+QUERY_FIELDS = {"injury": "Injury_Type", "consciousness": "Consciousness", "priority": "Priority"}
+
+
+class PatientIndex:
+    def __init__(self, patients=None):
+        self._patients = {}  # id -> patient
+        self._next_id = 0
+        self._hash = {f: {} for f in HASH_FIELDS}
+        self._sorted = {f: [] for f in RANGE_FIELDS}
+        if patients:
+            self.add_many(patients)
+
+    def __len__(self):
+        return len(self._patients)
+
+    def _keys(self, p):
+        hashed = {f: key(p.get(f, "")) for f, key in HASH_FIELDS.items()}
+        ranged = {f: _number(p.get(f, 0)) for f in RANGE_FIELDS}
+        return hashed, ranged
+
+    def _index(self, pid, patient):
+        hashed, ranged = self._keys(patient)
+        for f, k in hashed.items():
+            self._hash[f].setdefault(k, set()).add(pid)
+        for f, v in ranged.items():
+            bisect.insort(self._sorted[f], (v, pid))
+
+    def _unindex(self, pid, patient):
+        hashed, ranged = self._keys(patient)
+        for f, k in hashed.items():
+            ids = self._hash[f].get(k)
+            if ids is not None:
+                ids.discard(pid)
+                if not ids:
+                    del self._hash[f][k]
+        for f, v in ranged.items():
+            entries = self._sorted[f]
+            i = bisect.bisect_left(entries, (v, pid))
+            if i < len(entries) and entries[i] == (v, pid):
+                del entries[i]
+
+    def add(self, patient):
+        """Index one patient and return its id."""
+        pid = self._next_id
+        self._next_id += 1
+        self._patients[pid] = patient
+        self._index(pid, patient)
+        return pid
+
+    def add_many(self, patients):
+        """Index a batch; the sorted indexes are re-sorted once instead of one insert per patient."""
+        ids = []
+        for p in patients:
+            pid = self._next_id
+            self._next_id += 1
+            self._patients[pid] = p
+            hashed, ranged = self._keys(p)
+            for f, k in hashed.items():
+                self._hash[f].setdefault(k, set()).add(pid)
+            for f, v in ranged.items():
+                self._sorted[f].append((v, pid))
+            ids.append(pid)
+        for f in RANGE_FIELDS:
+            self._sorted[f].sort()
+        return ids
+
+    def remove(self, pid):
+        patient = self._patients.pop(pid)
+        self._unindex(pid, patient)
+        return patient
+
+    def reindex(self, pid, **changes):
+        """Apply field changes to an indexed patient (e.g. Priority=2) and keep the indexes right."""
+        patient = self._patients[pid]
+        self._unindex(pid, patient)
+        for field, value in changes.items():
+            patient[field] = value
+        self._index(pid, patient)
+
+    def counts(self, field):
+        """Number of patients per value of a hash-indexed field."""
+        return {k: len(ids) for k, ids in self._hash[field].items()}
+
+    def _range_slice(self, field, lo, hi):
+        entries = self._sorted[field]
+        start = 0 if lo is None else bisect.bisect_left(entries, (lo, -1))
+        end = len(entries) if hi is None else bisect.bisect_left(entries, (hi, -1))
+        return entries, start, max(start, end)
+
+    def query(self, injury=None, consciousness=None, priority=None, ranges=None):
+        """
+        Patients matching every given condition, in admission order.
+        ranges maps a field in RANGE_FIELDS to (low, high): low <= value < high,
+        either end can be None.
+        """
+        equal = {}
+        for arg, value in (("injury", injury), ("consciousness", consciousness), ("priority", priority)):
+            if value is not None:
+                field = QUERY_FIELDS[arg]
+                equal[field] = HASH_FIELDS[field](value)
+        ranges = ranges or {}
+
+        # pick the most selective condition to produce the candidates
+        best = None
+        for field, key in equal.items():
+            size = len(self._hash[field].get(key, ()))
+            if best is None or size < best[0]:
+                best = (size, "hash", field)
+        for field, (lo, hi) in ranges.items():
+            entries, start, end = self._range_slice(field, lo, hi)
+            if best is None or end - start < best[0]:
+                best = (end - start, "range", field)
+
+        if best is None:
+            candidates = self._patients.keys()
+        elif best[1] == "hash":
+            candidates = self._hash[best[2]].get(equal[best[2]], ())
+        else:
+            entries, start, end = self._range_slice(best[2], *ranges[best[2]])
+            candidates = [pid for _, pid in entries[start:end]]
+
+        out = []
+        for pid in sorted(candidates):
+            p = self._patients[pid]
+            hashed, ranged = self._keys(p)
+            if any(hashed[f] != k for f, k in equal.items()):
+                continue
+            if any((lo is not None and ranged[f] < lo) or (hi is not None and ranged[f] >= hi)
+                   for f, (lo, hi) in ranges.items()):
+                continue
+            out.append(p)
+        return out
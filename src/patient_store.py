@@ -0,0 +1,222 @@
+# columnar storage for the patients kept in memory by the dashboard.
+# every vital is parsed once when the record is added and kept in a typed array,
+# consciousness / injury are kept as small integer codes into a list of categories,
+# and rows are handed out as light views that behave like the old patient dicts
+import sys
+from array import array
+
+NUMERIC_FIELDS = ["Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level", "Recovery_Time"]
+CATEGORICAL_FIELDS = ["Consciousness", "Injury_Type"]
+FIELDS = ["Name"] + NUMERIC_FIELDS + CATEGORICAL_FIELDS + ["Priority"]
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+def _to_priority(value):
+    try:
+        return int(float(value))
+    except Exception:
+        return 0
+
+
+class PatientRow:
+    """Dict-like view of one patient inside a PatientStore."""
+
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._i = index
+
+    @property
+    def index(self):
+        return self._i
+
+    def __getitem__(self, key):
+        return self._store.get_value(self._i, key)
+
+    def __setitem__(self, key, value):
+        self._store.set_value(self._i, key, value)
+
+    def __contains__(self, key):
+        return key in FIELDS or key in self._store._extra.get(self._i, ())
+
+    def get(self, key, default=None):
+        try:
+            return self._store.get_value(self._i, key)
+        except KeyError:
+            return default
+
+    def keys(self):
+        return FIELDS + list(self._store._extra.get(self._i, {}))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"PatientRow({self.to_dict()!r})"
+
+
+class PatientStore:
+    """
+    Patients kept as typed columns. Iterating, indexing and slicing give PatientRow
+    views, so code written for a list of dicts keeps working on it.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._numeric = {f: array("d") for f in NUMERIC_FIELDS}
+        self._priority = array("b")
+        self._codes = {f: array("H") for f in CATEGORICAL_FIELDS}
+        self._categories = {f: [] for f in CATEGORICAL_FIELDS}
+        self._lookup = {f: {} for f in CATEGORICAL_FIELDS}
+        self._extra = {}  # row index -> fields that are not part of the schema
+
+    @classmethod
+    def from_columns(cls, names, numeric, priority, codes, categories):
+        """Build a store directly from already typed columns (used by the snapshot loader)."""
+        store = cls()
+        store._names = [sys.intern(n) for n in names]
+        for f in NUMERIC_FIELDS:
+            store._numeric[f] = numeric[f]
+        store._priority = priority
+        for f in CATEGORICAL_FIELDS:
+            store._codes[f] = codes[f]
+            store._categories[f] = [sys.intern(c) for c in categories[f]]
+            store._lookup[f] = {c: i for i, c in enumerate(store._categories[f])}
+        return store
+
+    @classmethod
+    def from_records(cls, records):
+        store = cls()
+        store.extend(records)
+        return store
+
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        for i in range(len(self._names)):
+            yield PatientRow(self, i)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PatientRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("patient index out of range")
+        return PatientRow(self, index)
+
+    def code_for(self, field, value):
+        """Return the integer code of a category, adding it if it is new."""
+        value = sys.intern(str(value))
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = len(self._categories[field])
+            self._categories[field].append(value)
+            lookup[value] = code
+        return code
+
+    def append(self, record):
+        """Add one patient (a dict or a row) and return its row view."""
+        self._names.append(sys.intern(str(record.get("Name", ""))))
+        for f in NUMERIC_FIELDS:
+            self._numeric[f].append(_to_float(record.get(f, 0)))
+        self._priority.append(_to_priority(record.get("Priority", 0)))
+        self._codes["Consciousness"].append(self.code_for("Consciousness", record.get("Consciousness", "Conscious")))
+        self._codes["Injury_Type"].append(self.code_for("Injury_Type", record.get("Injury_Type", "None")))
+
+        i = len(self._names) - 1
+        for key in record.keys():
+            if key not in FIELDS:
+                self._extra.setdefault(i, {})[key] = record[key]
+        return PatientRow(self, i)
+
+    def extend(self, records):
+        for r in records:
+            self.append(r)
+
+    def get_value(self, i, key):
+        if key in self._numeric:
+            return self._numeric[key][i]
+        if key == "Priority":
+            return self._priority[i]
+        if key in self._codes:
+            return self._categories[key][self._codes[key][i]]
+        if key == "Name":
+            return self._names[i]
+        extra = self._extra.get(i, {})
+        if key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def set_value(self, i, key, value):
+        if key in self._numeric:
+            self._numeric[key][i] = _to_float(value)
+        elif key == "Priority":
+            self._priority[i] = _to_priority(value)
+        elif key in self._codes:
+            self._codes[key][i] = self.code_for(key, value)
+        elif key == "Name":
+            self._names[i] = sys.intern(str(value))
+        else:
+            self._extra.setdefault(i, {})[key] = value
+
+    def column(self, field):
+        """The typed array behind a numeric field (or Priority). Do not modify it."""
+        if field == "Priority":
+            return self._priority
+        return self._numeric[field]
+
+    def set_column(self, field, values):
+        """Replace a whole numeric column (or Priority) at once, e.g. after a batch re-triage."""
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        current = self.column(field)
+        if len(values) != len(current):
+            raise ValueError(f"{field}: expected {len(current)} values, got {len(values)}")
+        new = array(current.typecode, values)
+        if field == "Priority":
+            self._priority = new
+        else:
+            self._numeric[field] = new
+
+    def names(self):
+        return self._names
+
+    def codes(self, field):
+        return self._codes[field]
+
+    def categories(self, field):
+        return list(self._categories[field])
+
+    def value_counts(self, field):
+        """Counts per value of Priority or a categorical field, without building rows."""
+        if field == "Priority":
+            counts = {}
+            for v in self._priority:
+                counts[v] = counts.get(v, 0) + 1
+            return counts
+        per_code = [0] * len(self._categories[field])
+        for c in self._codes[field]:
+            per_code[c] += 1
+        return {self._categories[field][c]: n for c, n in enumerate(per_code) if n}
+
+    def to_records(self):
+        return [row.to_dict() for row in self]
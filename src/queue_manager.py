@@ -1,5 +1,13 @@
-#this contains that sorts the patients in the queue according to their priority fromm high (1) to low (4)
-#it is bubble sorting
+# orders the patients by priority from high (1) to low (4): sort_by_priority is the old
+# bubble sort over a list, TriageQueue the heap-based live queue used by the dashboard
+import heapq
+import itertools
+import collections
+
+from src.instrumentation import timed
+
+
+@timed("sort_by_priority")
 def sort_by_priority(patients):
     n = len(patients)
     for i in range(n):
@@ -7,3 +15,171 @@ def sort_by_priority(patients):
             if patients[j]["Priority"] > patients[j + 1]["Priority"]:
                 patients[j], patients[j + 1] = patients[j + 1], patients[j]
     return patients
+
+
+def _priority_of(patient):
+    try:
+        return int(float(patient.get("Priority", 4)))
+    except Exception:
+        return 4
+
+
+# the live queue used by the dashboard, instead of sorting the whole list every time we
+# keep a binary heap of (priority, arrival order, id) so push/pop are O(log n) and patients
+# with the same priority come out in the order they arrived (FIFO)
+class TriageQueue:
+    def __init__(self, patients=None):
+        self._heap = []
+        self._entries = {}   # patient id -> live heap entry
+        self._order = itertools.count()
+        self._next_id = 1    # next auto-assigned id, always past every id seen so far
+        if patients:
+            for p in patients:
+                self.push(p)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, patient_id):
+        return patient_id in self._entries
+
+    @timed("queue_push")
+    def push(self, patient, patient_id=None, priority=None):
+        """
+        Add a patient and return its id (a new one is generated if not given). Pushing
+        an id that is already queued replaces that patient.
+        """
+        if patient_id is None:
+            patient_id = self._next_id
+        if isinstance(patient_id, int) and patient_id >= self._next_id:
+            self._next_id = patient_id + 1
+        if patient_id in self._entries:
+            self._discard(patient_id)
+        if priority is None:
+            priority = _priority_of(patient)
+        entry = [priority, next(self._order), patient_id, patient]
+        self._entries[patient_id] = entry
+        heapq.heappush(self._heap, entry)
+        return patient_id
+
+    @timed("queue_push_many")
+    def push_many(self, patients):
+        """Add a whole batch in one step (one heapify instead of a push per patient)."""
+        ids = []
+        for p in patients:
+            patient_id = self._next_id
+            self._next_id += 1
+            entry = [_priority_of(p), next(self._order), patient_id, p]
+            self._entries[patient_id] = entry
+            self._heap.append(entry)
+            ids.append(patient_id)
+        heapq.heapify(self._heap)
+        return ids
+
+    def _discard(self, patient_id):
+        # lazy deletion: the entry stays in the heap but is marked dead
+        entry = self._entries.pop(patient_id)
+        patient = entry[3]
+        entry[3] = None
+        # rebuild once dead entries dominate so the heap does not keep growing
+        if len(self._heap) > 2 * len(self._entries) + 32:
+            self._heap = [e for e in self._heap if e[3] is not None]
+            heapq.heapify(self._heap)
+        return patient
+
+    def _drop_dead(self):
+        while self._heap and self._heap[0][3] is None:
+            heapq.heappop(self._heap)
+
+    @timed("queue_pop")
+    def pop(self):
+        """Remove and return (patient_id, patient) with the highest priority."""
+        self._drop_dead()
+        if not self._heap:
+            raise IndexError("pop from an empty triage queue")
+        _, _, patient_id, patient = heapq.heappop(self._heap)
+        del self._entries[patient_id]
+        return patient_id, patient
+
+    def _walk(self):
+        # live entries in pop order without touching the heap: a second small heap holds
+        # the frontier (children of everything yielded so far), so the first k entries
+        # cost O(k log k) whatever the size of the queue
+        heap = self._heap
+        if not heap:
+            return
+        frontier = [(heap[0][0], heap[0][1], 0)]
+        while frontier:
+            _, _, i = heapq.heappop(frontier)
+            entry = heap[i]
+            if entry[3] is not None:
+                yield entry
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], heap[child][1], child))
+
+    @timed("queue_peek")
+    def peek(self, n=1):
+        """Return the next n patients (in pop order) without removing them."""
+        if n <= 0:
+            return []
+        return [(e[2], e[3]) for e in itertools.islice(self._walk(), n)]
+
+    @timed("queue_page")
+    def page(self, after=None, before=None, size=None):
+        """
+        One page of the queue in pop order, as a pagination.Page. Cursors are the
+        (priority, arrival) keys from a previous page: after=page.last for the next page,
+        before=page.first for the previous one. Page N costs O(N * size * log n).
+        """
+        from src.pagination import Page, PAGE_SIZE
+
+        size = size or PAGE_SIZE
+        rows, has_prev, has_next = [], False, False
+        if before is not None:
+            # everything in front of the cursor, keeping the last `size` (+1 to know if there is more)
+            window = collections.deque(maxlen=size + 1)
+            for e in self._walk():
+                if (e[0], e[1]) >= tuple(before):
+                    has_next = True
+                    break
+                window.append(e)
+            has_prev = len(window) > size
+            rows = list(window)[-size:]
+        else:
+            for e in self._walk():
+                if after is not None and (e[0], e[1]) <= tuple(after):
+                    has_prev = True
+                    continue
+                if len(rows) == size:
+                    has_next = True
+                    break
+                rows.append(e)
+        return Page([(e[2], e[3]) for e in rows],
+                    first=(rows[0][0], rows[0][1]) if rows else None,
+                    last=(rows[-1][0], rows[-1][1]) if rows else None,
+                    has_prev=has_prev, has_next=has_next)
+
+    def remove(self, patient_id):
+        """Remove a patient by id and return it."""
+        if patient_id not in self._entries:
+            raise KeyError(patient_id)
+        patient = self._discard(patient_id)
+        self._drop_dead()
+        return patient
+
+    def reprioritize(self, patient_id, priority):
+        """Change the priority of a queued patient (goes to the back of its new level)."""
+        if patient_id not in self._entries:
+            raise KeyError(patient_id)
+        patient = self._entries[patient_id][3]
+        patient["Priority"] = priority
+        self.push(patient, patient_id=patient_id, priority=priority)
+
+    def get(self, patient_id, default=None):
+        entry = self._entries.get(patient_id)
+        return entry[3] if entry else default
+
+    def ordered(self):
+        """All queued patients in pop order (does not modify the queue)."""
+        return [p for _, p in self.peek(len(self._entries))]
@@ -1,6 +1,23 @@
 # Implements training and prediction of recovery time
 # using the Normal Equation: (X^T X)β = X^T y
 # Solved via Gaussian elimination (Gauss–Jordan).
+# When NumPy is installed the same model is fitted with a QR factorization and
+# predictions for a whole dataset are done in one vectorized call; the list-based
+# functions below stay as the pure-Python fallback.
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+from src.instrumentation import timed
+
+RIDGE_ALPHA = 1e-6  # small ridge penalty used when X^T X is singular
+# the vitals the recovery time is regressed on (every recovery model uses this list)
+RECOVERY_FEATURES = ["Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level"]
+# unit of Recovery_Time in the dataset (and so of every prediction): 24 for a minor
+# injury, 72 for a fracture. Shown to the user and used by the bed simulator.
+RECOVERY_TIME_UNIT = "hours"
 
 
 def matmul(A, B):
@@ -67,28 +84,114 @@ def gauss_jordan_solve(A, b):
 
 
 
+def has_recovery_time(patient):
+    """True when the patient has a recorded (positive) Recovery_Time. Only these rows
+    are trained on, a predicted value would make the model learn its own output."""
+    try:
+        return float(patient.get("Recovery_Time", 0)) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _design_row(patient, feature_names):
+    row = [1.0]
+    for f in feature_names:
+        try:
+            row.append(float(patient.get(f, 0)))
+        except Exception:
+            row.append(0.0)
+    return row
+
+
 def build_design_matrix(patients, feature_names):
     """
     Build X (with intercept) and y from patient dicts.
     X row = [1, feature1, feature2, ...]
     y = Recovery_Time
     """
+    if hasattr(patients, "column"):
+        # PatientStore: the columns are already floats
+        cols = [patients.column(f) for f in feature_names]
+        X = [[1.0, *vals] for vals in zip(*cols)]
+        return X, list(patients.column("Recovery_Time"))
+
     X, y = [], []
     for p in patients:
-        y_val = p.get("Recovery_Time", 0)
-        row = [1.0]  # this is the intercept
-        for f in feature_names:
-            try:
-                row.append(float(p.get(f, 0)))
-            except Exception:
-                row.append(0.0)
-        X.append(row)
-        y.append(float(y_val))
+        X.append(_design_row(p, feature_names))  # 1.0 first: this is the intercept
+        y.append(float(p.get("Recovery_Time", 0)))
     return X, y
 
 
-def fit_linear_regression(patients, feature_names):
-    """Fit regression coefficients for y = b0 + b1*x1 + ... + bk*xk."""
+def _ridge(A, alpha=RIDGE_ALPHA):
+    """Copy of A with a small penalty on the diagonal (the intercept is not penalized)."""
+    n = len(A)
+    scale = max(1.0, sum(abs(A[i][i]) for i in range(n)) / n) if n else 1.0
+    out = [row[:] for row in A]
+    for i in range(1, n):
+        out[i][i] += alpha * scale
+    return out
+
+
+def solve_normal_equations(XTX, XTy):
+    """Solve (X^T X)β = X^T y, falling back to a ridge solution if the system is singular."""
+    if np is not None:
+        A, b = np.asarray(XTX, dtype=float), np.asarray(XTy, dtype=float)
+        try:
+            beta = np.linalg.solve(A, b)
+            if np.all(np.isfinite(beta)) and np.linalg.cond(A) < 1e12:
+                return beta.tolist()
+        except np.linalg.LinAlgError:
+            pass
+        return np.linalg.solve(np.asarray(_ridge(XTX), dtype=float), b).tolist()
+    try:
+        return gauss_jordan_solve(XTX, XTy)
+    except ValueError:
+        return gauss_jordan_solve(_ridge(XTX), XTy)
+
+
+def design_arrays(patients, feature_names, with_target=True):
+    """Build X (and y) as NumPy arrays in a single pass over the patients."""
+    k = len(feature_names) + 1
+    if hasattr(patients, "column"):
+        # PatientStore columns are typed arrays, NumPy can wrap them without copying
+        X = np.ones((len(patients), k))
+        for j, f in enumerate(feature_names, start=1):
+            X[:, j] = np.frombuffer(patients.column(f), dtype=float)
+        y = np.frombuffer(patients.column("Recovery_Time"), dtype=float) if with_target else None
+        return X, y
+
+    rows, y = [], []
+    for p in patients:
+        rows.append(_design_row(p, feature_names))
+        if with_target:
+            y.append(float(p.get("Recovery_Time", 0)))
+    X = np.array(rows, dtype=float).reshape(-1, k)
+    return X, (np.array(y, dtype=float) if with_target else None)
+
+
+def _fit_numpy(patients, feature_names):
+    X, y = design_arrays(patients, feature_names)
+    # QR keeps the problem well conditioned (no squaring of X like in X^T X)
+    Q, R = np.linalg.qr(X)
+    diag = np.abs(np.diag(R))
+    if X.shape[0] >= X.shape[1] and diag.min() > 1e-10 * max(diag.max(), 1.0):
+        beta = np.linalg.solve(R, Q.T @ y)
+    else:
+        beta = np.array(solve_normal_equations((X.T @ X).tolist(), (X.T @ y).tolist()))
+    return beta.tolist()
+
+
+@timed("regression_fit")
+def fit_linear_regression(patients, feature_names, backend="auto"):
+    """Fit regression coefficients for y = b0 + b1*x1 + ... + bk*xk.
+
+    backend: "auto" (NumPy when installed), "numpy" or "python".
+    """
+    if backend == "numpy" and np is None:
+        raise RuntimeError("NumPy backend requested but numpy is not installed")
+    if backend in ("auto", "numpy") and np is not None and patients:
+        return {"features": feature_names[:], "beta": _fit_numpy(patients, feature_names)}
+
     X, y = build_design_matrix(patients, feature_names)
     y_col = [[val] for val in y]
 
@@ -97,7 +200,7 @@ def fit_linear_regression(patients, feature_names):
     XTy = matmul(XT, y_col)
 
     rhs = [row[0] for row in XTy]
-    beta = gauss_jordan_solve(XTX, rhs)
+    beta = solve_normal_equations(XTX, rhs)
 
     return {"features": feature_names[:], "beta": beta}
 
@@ -115,11 +218,98 @@ def predict_one(model, patient):
     return s
 
 
+@timed("regression_predict_many")
 def predict_many(model, patients):
-    """Predict for a list of patient dicts."""
+    """Predict for a list of patient dicts (one matrix product with NumPy)."""
+    if np is not None and patients:
+        X, _ = design_arrays(patients, model["features"], with_target=False)
+        return (X @ np.asarray(model["beta"], dtype=float)).tolist()
     return [predict_one(model, p) for p in patients]
 
 
+class RecoveryRegression:
+    """
+    Linear regression kept as sufficient statistics X^T X and X^T y.
+    Adding or removing a row costs O(k^2) and re-solving costs O(k^3),
+    independent of how many patients have been seen.
+    """
+
+    def __init__(self, feature_names):
+        self.features = list(feature_names)
+        k = len(self.features) + 1
+        self.xtx = [[0.0] * k for _ in range(k)]
+        self.xty = [0.0] * k
+        self.n = 0
+        self._beta = None
+
+    def _accumulate(self, patient, sign):
+        row = _design_row(patient, self.features)
+        y = float(patient.get("Recovery_Time", 0))
+        k = len(row)
+        for i in range(k):
+            ri = sign * row[i]
+            xtx_i = self.xtx[i]
+            for j in range(k):
+                xtx_i[j] += ri * row[j]
+            self.xty[i] += ri * y
+        self.n += sign
+        self._beta = None
+
+    def add(self, patient):
+        self._accumulate(patient, 1)
+        return self
+
+    def add_many(self, patients):
+        for p in patients:
+            self._accumulate(p, 1)
+        return self
+
+    def remove(self, patient):
+        """Take back a row that was added before (same values)."""
+        if self.n <= 0:
+            raise ValueError("No rows to remove")
+        self._accumulate(patient, -1)
+        return self
+
+    def merge(self, other):
+        """Add the statistics of another shard; the result is exactly the model of both."""
+        if other.features != self.features:
+            raise ValueError("Cannot merge regressions over different features")
+        for row, theirs in zip(self.xtx, other.xtx):
+            for j, v in enumerate(theirs):
+                row[j] += v
+        for i, v in enumerate(other.xty):
+            self.xty[i] += v
+        self.n += other.n
+        self._beta = None
+        return self
+
+    @timed("regression_solve")
+    def solve(self):
+        if self._beta is None:
+            self._beta = solve_normal_equations(self.xtx, self.xty)
+        return self._beta
+
+    def to_model(self):
+        """Return a plain {"features", "beta"} model usable by predict_one."""
+        return {"features": self.features[:], "beta": self.solve()}
+
+    def predict(self, patient):
+        return predict_one(self.to_model(), patient)
+
+    def to_state(self):
+        return {"features": self.features[:], "xtx": [row[:] for row in self.xtx],
+                "xty": self.xty[:], "n": self.n}
+
+    @classmethod
+    def from_state(cls, state):
+        reg = cls(state["features"])
+        reg.xtx = [[float(v) for v in row] for row in state["xtx"]]
+        reg.xty = [float(v) for v in state["xty"]]
+        reg.n = int(state["n"])
+        return reg
+
+
 def mae(y_true, y_pred):
     n = len(y_true)
     return sum(abs(y_true[i] - y_pred[i]) for i in range(n)) / n if n else 0.0
@@ -144,8 +334,7 @@ _cached_model = None  # store model in memory to avoid retraining repeatedly
 
 def train_recovery_model(patients):
     global _cached_model
-    features = ["Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level"]
-    _cached_model = fit_linear_regression(patients, features)
+    _cached_model = fit_linear_regression(patients, RECOVERY_FEATURES)
     return _cached_model
 
 
@@ -156,3 +345,13 @@ def predict_recovery_time(patient):
             "Recovery model not trained. "
         )
     return predict_one(_cached_model, patient)
+
+
+
+def predict_recovery_times(patients):
+    """Batch version of predict_recovery_time using the cached model."""
+    if _cached_model is None:
+        raise RuntimeError(
+            "Recovery model not trained. "
+        )
+    return predict_many(_cached_model, patients)
@@ -0,0 +1,136 @@
+# background chart rendering for the dashboard.
+# charts are drawn by a small pool of worker processes using the headless Agg backend,
+# so the console never waits on matplotlib. Each chart is cached under a hash of the
+# numbers it is drawn from (kept in report/plot_meta.json), so a chart is only redrawn
+# when its inputs actually changed - not just when the patient count changed.
+import os
+import json
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from src.instrumentation import incr
+
+REPORT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../report"))
+META_PATH = os.path.join(REPORT_DIR, "plot_meta.json")
+
+
+def content_hash(kind, args):
+    """Stable hash of the chart kind and the aggregated data it is drawn from."""
+    payload = json.dumps([kind, args], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def columns_digest(*columns):
+    """Hash of the raw bytes of typed columns, for charts drawn from many raw points
+    (hashing the bytes is far cheaper than serializing every point)."""
+    h = hashlib.sha1()
+    for col in columns:
+        h.update(getattr(col, "typecode", "").encode("ascii"))
+        h.update(memoryview(col).cast("B"))
+    return h.hexdigest()
+
+
+def _init_worker():
+    # must happen before pyplot is imported in the worker
+    os.environ["MPLBACKEND"] = "Agg"
+
+
+def render_chart(kind, args, out_path):
+    """Draw one chart and save it as a PNG (runs inside a worker process)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if kind == "cluster_plot":
+        from src.visualize_clusters import draw_labeled_clusters as draw
+    else:
+        from src.statistics_visuals import DRAWERS
+        draw = DRAWERS[kind]
+
+    fig = draw(*args)
+    fig.savefig(out_path)
+    plt.close(fig)
+    return out_path
+
+
+class RenderQueue:
+    def __init__(self, max_workers=2, report_dir=REPORT_DIR):
+        self.report_dir = report_dir
+        self.meta_path = os.path.join(report_dir, "plot_meta.json")
+        self._lock = threading.Lock()
+        self._pending = {}  # kind -> (hash, future)
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _record(self, kind, digest):
+        with self._lock:
+            meta = self._read_meta()
+            meta.setdefault("hashes", {})[kind] = digest
+            os.makedirs(self.report_dir, exist_ok=True)
+            with open(self.meta_path, "w") as f:
+                json.dump(meta, f)
+
+    def is_current(self, kind, digest):
+        out_path = os.path.join(self.report_dir, f"{kind}.png")
+        return os.path.exists(out_path) and self._read_meta().get("hashes", {}).get(kind) == digest
+
+    def submit(self, kind, *args, key=None):
+        """
+        Queue a chart for rendering. Returns None when the saved chart already matches
+        these inputs, otherwise a Future that resolves to the PNG path. key replaces
+        args in the cache hash when args are large (it must change whenever they do).
+        """
+        digest = content_hash(kind, args if key is None else key)
+        with self._lock:
+            pending = self._pending.get(kind)
+            if pending and pending[0] == digest and not pending[1].done():
+                return pending[1]
+        if self.is_current(kind, digest):
+            incr("charts_cached")
+            return None
+        incr("charts_rendered")
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        out_path = os.path.join(self.report_dir, f"{kind}.png")
+        # each render writes its own file; only the newest one for a kind replaces the chart
+        tmp_path = os.path.join(self.report_dir, f".{kind}.{digest[:12]}.png")
+        with self._lock:
+            future = self._pool.submit(render_chart, kind, args, tmp_path)
+            self._pending[kind] = (digest, future)
+
+        def _done(f, kind=kind, digest=digest):
+            with self._lock:
+                latest = self._pending.get(kind, (None, None))[1] is f
+            exc = f.exception()
+            if exc is not None:
+                print(f"\n[WARN] {kind} could not be rendered: {exc!r}")
+            if exc is None and latest:
+                os.replace(tmp_path, out_path)
+                self._record(kind, digest)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        future.add_done_callback(_done)
+        return future
+
+    def wait(self):
+        """Block until every queued chart is rendered."""
+        with self._lock:
+            futures = [f for _, f in self._pending.values()]
+        for f in futures:
+            f.exception()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
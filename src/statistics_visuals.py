@@ -1,25 +1,36 @@
 import os
 import json
-import matplotlib.pyplot as plt
+from src.stats_aggregator import normalize_injury_key
+from src.instrumentation import timed
 
 REPORT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../report"))
-os.makedirs(REPORT_DIR, exist_ok=True)
-
-plt.style.use("seaborn-v0_8-colorblind")
-plt.rcParams.update({
-    "font.size": 11,
-    "figure.facecolor": "white",
-    "axes.edgecolor": "#333333",
-    "axes.titlesize": 13,
-    "axes.labelsize": 11,
-    "axes.grid": True,
-    "grid.alpha": 0.3,
-})
+
+_pyplot = None
+
+
+def _plt():
+    # pyplot is slow to import, so it is loaded (and styled) the first time a chart is drawn
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib.pyplot as plt
+        plt.style.use("seaborn-v0_8-colorblind")
+        plt.rcParams.update({
+            "font.size": 11,
+            "figure.facecolor": "white",
+            "axes.edgecolor": "#333333",
+            "axes.titlesize": 13,
+            "axes.labelsize": 11,
+            "axes.grid": True,
+            "grid.alpha": 0.3,
+        })
+        _pyplot = plt
+    return _pyplot
 
 #after the data changes, meaning when wee add anew patient, the statictis and visual vary, so the
 # plots will stay on the old un-updated data, thus this function deletes the plots when the number
 #of patients changes from the folder "reports" then generates new one according to current data
 def clear_old_plots(plot_type=None, current_patient_count=None):
+    os.makedirs(REPORT_DIR, exist_ok=True)
     meta_path = os.path.join(REPORT_DIR, "plot_meta.json")
     data = {}
 
@@ -49,7 +60,21 @@ def clear_old_plots(plot_type=None, current_patient_count=None):
             json.dump(data, f)
 
 
+@timed("compute_statistics")
 def compute_statistics(patients):
+    # a PatientStore already has the counts per category, no need to touch every row
+    if hasattr(patients, "value_counts"):
+        priority_counts = patients.value_counts("Priority")
+        conscious_counts = {}
+        for k, v in patients.value_counts("Consciousness").items():
+            k = str(k).strip().capitalize()
+            conscious_counts[k] = conscious_counts.get(k, 0) + v
+        injury_counts = {}
+        for k, v in patients.value_counts("Injury_Type").items():
+            k = normalize_injury_key(k)
+            injury_counts[k] = injury_counts.get(k, 0) + v
+        return priority_counts, injury_counts, conscious_counts
+
     priority_counts = {}
     injury_counts = {}
     conscious_counts = {}
@@ -64,10 +89,7 @@ def compute_statistics(patients):
         conscious_counts[cns] = conscious_counts.get(cns, 0) + 1
 
         # Injury Type 
-        injury = str(p.get("Injury_Type", "None")).strip().lower()
-        if injury in ("", "-", "_", "unknown", "nan", "na", "n/a", "none", "0"):
-            injury = "none"
-        injury = injury.capitalize()
+        injury = normalize_injury_key(p.get("Injury_Type", "None"))
         injury_counts[injury] = injury_counts.get(injury, 0) + 1
 
    #merging duplicates underr same categroy likee injury tyoe
@@ -80,9 +102,9 @@ def compute_statistics(patients):
 
 
 
-def plot_priority_distribution(priority_counts, current_patient_count=None):
-    clear_old_plots("priority_distribution", current_patient_count)
-
+def draw_priority_distribution(priority_counts):
+    """Build the figure only (no saving / showing), see render_queue."""
+    plt = _plt()
     labels = [f"P{p}" for p in sorted(priority_counts.keys())]
     values = [priority_counts[p] for p in sorted(priority_counts.keys())]
 
@@ -98,14 +120,22 @@ def plot_priority_distribution(priority_counts, current_patient_count=None):
                 ha="center", va="bottom", fontsize=10)
 
     plt.tight_layout()
+    return fig
+
+
+@timed("plot_priority_distribution")
+def plot_priority_distribution(priority_counts, current_patient_count=None):
+    plt = _plt()
+    clear_old_plots("priority_distribution", current_patient_count)
+
+    fig = draw_priority_distribution(priority_counts)
     plt.savefig(os.path.join(REPORT_DIR, "priority_distribution.png"))
     plt.show()
     plt.close(fig)
 
 
-def plot_injury_distribution(injury_counts, current_patient_count=None):
-    clear_old_plots("injury_distribution", current_patient_count)
-
+def draw_injury_distribution(injury_counts):
+    plt = _plt()
     labels = list(injury_counts.keys())
     values = list(injury_counts.values())
 
@@ -120,14 +150,22 @@ def plot_injury_distribution(injury_counts, current_patient_count=None):
         t.set_fontsize(10)
 
     plt.tight_layout()
+    return fig
+
+
+@timed("plot_injury_distribution")
+def plot_injury_distribution(injury_counts, current_patient_count=None):
+    plt = _plt()
+    clear_old_plots("injury_distribution", current_patient_count)
+
+    fig = draw_injury_distribution(injury_counts)
     plt.savefig(os.path.join(REPORT_DIR, "injury_distribution.png"))
     plt.show()
     plt.close(fig)
 
 
-def plot_consciousness_distribution(conscious_counts, current_patient_count=None):
-    clear_old_plots("consciousness_distribution", current_patient_count)
-
+def draw_consciousness_distribution(conscious_counts):
+    plt = _plt()
     labels = list(conscious_counts.keys())
     values = list(conscious_counts.values())
 
@@ -143,6 +181,23 @@ def plot_consciousness_distribution(conscious_counts, current_patient_count=None
                 ha="center", va="bottom", fontsize=10)
 
     plt.tight_layout()
+    return fig
+
+
+@timed("plot_consciousness_distribution")
+def plot_consciousness_distribution(conscious_counts, current_patient_count=None):
+    plt = _plt()
+    clear_old_plots("consciousness_distribution", current_patient_count)
+
+    fig = draw_consciousness_distribution(conscious_counts)
     plt.savefig(os.path.join(REPORT_DIR, "consciousness_distribution.png"))
     plt.show()
     plt.close(fig)
+
+
+# kind of chart -> function that draws it, for render_chart / the render queue
+DRAWERS = {
+    "priority_distribution": draw_priority_distribution,
+    "injury_distribution": draw_injury_distribution,
+    "consciousness_distribution": draw_consciousness_distribution,
+}
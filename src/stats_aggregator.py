@@ -0,0 +1,110 @@
+# running statistics for the dashboard.
+# instead of rescanning every patient when the statistics menu opens, the aggregator is
+# updated as patients are admitted, re-triaged or removed (O(1) each), and the counts,
+# means and variances are available at any time. Means/variances use Welford's method,
+# which can also be run backwards to take a patient out again.
+import math
+
+VITALS = ["Age", "Heart_Rate", "Blood_Pressure", "Oxygen_Level", "Recovery_Time"]
+
+
+def normalize_injury_key(injury):
+    injury = str(injury).strip().lower()
+    if injury in ("", "-", "_", "unknown", "nan", "na", "n/a", "none", "0"):
+        injury = "none"
+    return injury.capitalize()
+
+
+def _priority_key(p):
+    try:
+        return int(float(p.get("Priority", 0)))
+    except Exception:
+        return 0
+
+
+def _bump(counts, key, delta):
+    n = counts.get(key, 0) + delta
+    if n:
+        counts[key] = n
+    else:
+        counts.pop(key, None)
+
+
+class RunningMoments:
+    """Count, mean and variance of a stream of numbers that supports removal."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.n -= 1
+        self.mean -= delta / self.n
+        self.m2 = max(self.m2 - delta * (x - self.mean), 0.0)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+
+class StatsAggregator:
+    def __init__(self):
+        self.count = 0
+        self.priority_counts = {}
+        self.injury_counts = {}
+        self.conscious_counts = {}
+        self.vitals = {v: RunningMoments() for v in VITALS}
+
+    @classmethod
+    def from_patients(cls, patients):
+        agg = cls()
+        for p in patients:
+            agg.add(p)
+        return agg
+
+    def _apply(self, p, sign):
+        self.count += sign
+        _bump(self.priority_counts, _priority_key(p), sign)
+        _bump(self.conscious_counts, str(p.get("Consciousness", "Unknown")).strip().capitalize(), sign)
+        _bump(self.injury_counts, normalize_injury_key(p.get("Injury_Type", "None")), sign)
+        for v, moments in self.vitals.items():
+            try:
+                x = float(p.get(v, 0))
+            except Exception:
+                continue
+            if not math.isfinite(x):
+                continue
+            if sign > 0:
+                moments.add(x)
+            else:
+                moments.remove(x)
+
+    def add(self, patient):
+        self._apply(patient, 1)
+
+    def remove(self, patient):
+        """Take out a patient that was added before (with the same values)."""
+        self._apply(patient, -1)
+
+    def retriage(self, old_priority, new_priority):
+        """Move one patient from one priority level to another."""
+        _bump(self.priority_counts, int(old_priority), -1)
+        _bump(self.priority_counts, int(new_priority), 1)
+
+    def statistics(self):
+        """Same (priority, injury, consciousness) counts that compute_statistics returns."""
+        return dict(self.priority_counts), dict(self.injury_counts), dict(self.conscious_counts)
+
+    def vital_summary(self):
+        return {v: {"count": m.n, "mean": m.mean, "variance": m.variance} for v, m in self.vitals.items()}
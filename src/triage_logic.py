@@ -4,33 +4,134 @@
 # 2 = Urgent
 # 3 = Delayed
 # 4 = Routine (lowest)
+import math
+import operator
+from array import array
 
-def assign_priority(patient):
-   
-    def as_int(val, default):
-        try:
-            return int(float(val))
-        except Exception:
-            return default
-
-    # extraccting the attributes safely
-    hr = as_int(patient.get("Heart_Rate", 0), 0)
-    bp = as_int(patient.get("Blood_Pressure", 100), 100)
-    o2 = as_int(patient.get("Oxygen_Level", 96), 96)
-
-    state = str(patient.get("Consciousness", "unknown")).strip().lower()
-    injury = str(patient.get("Injury_Type", "none")).strip().lower()
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the batch path falls back to a plain loop
+    np = None
 
-    
+# the triage rules as data, so the single-patient and the batch path can never disagree.
+# each level is a list of clauses; a clause is a list of (attribute, op, value) checks that
+# must all hold, and the level matches if any clause holds. Levels are tried in order.
+RULES = [
     # prio 1 → Immediate (critical)
-    if state == "unconscious" or o2 < 85 or bp < 80:
-        return 1
+    (1, [[("state", "==", "unconscious")], [("o2", "<", 85)], [("bp", "<", 80)]]),
     # 2 → Urgent
-    elif hr > 120 or injury in ("bleeding", "fracture") or (o2 < 90 and bp < 90):
-        return 2
+    (2, [[("hr", ">", 120)], [("injury", "in", ("bleeding", "fracture"))], [("o2", "<", 90), ("bp", "<", 90)]]),
     # 3 → Delayed
-    elif injury == "minor" or 90 <= hr <= 120:
-        return 3
-    # 4 → Routine
-    else:
-        return 4
+    (3, [[("injury", "==", "minor")], [("hr", ">=", 90), ("hr", "<=", 120)]]),
+]
+# 4 → Routine
+DEFAULT_PRIORITY = 4
+
+# attribute -> (patient field, default when missing / not a number)
+NUMERIC_ATTRS = {"hr": ("Heart_Rate", 0), "bp": ("Blood_Pressure", 100), "o2": ("Oxygen_Level", 96)}
+TEXT_ATTRS = {"state": ("Consciousness", "unknown"), "injury": ("Injury_Type", "none")}
+
+_OPS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "in": lambda a, b: a in b,
+}
+
+
+def _as_int(val, default):
+    try:
+        return int(float(val))
+    except Exception:
+        return default
+
+
+def _attributes(patient):
+    # extraccting the attributes safely
+    attrs = {a: _as_int(patient.get(field, default), default) for a, (field, default) in NUMERIC_ATTRS.items()}
+    for a, (field, default) in TEXT_ATTRS.items():
+        attrs[a] = str(patient.get(field, default)).strip().lower()
+    return attrs
+
+
+def _matches(clauses, attrs):
+    for clause in clauses:
+        if all(_OPS[op](attrs[a], v) for a, op, v in clause):
+            return True
+    return False
+
+
+def assign_priority(patient):
+    attrs = _attributes(patient)
+    for priority, clauses in RULES:
+        if _matches(clauses, attrs):
+            return priority
+    return DEFAULT_PRIORITY
+
+
+def _np_int_column(values, default):
+    col = np.asarray(values, dtype=float)
+    ok = np.isfinite(col)
+    return np.where(ok, np.trunc(np.where(ok, col, 0.0)), default)
+
+
+def _columns(patients):
+    """Attribute columns for a PatientStore (read from its arrays) or a list of dicts."""
+    n = len(patients)
+    cols = {}
+    if hasattr(patients, "column"):
+        for a, (field, default) in NUMERIC_ATTRS.items():
+            cols[a] = patients.column(field)
+        for a, (field, default) in TEXT_ATTRS.items():
+            # categories are evaluated once, then mapped through the codes
+            lowered = [str(c).strip().lower() for c in patients.categories(field)]
+            cols[a] = [lowered[c] for c in patients.codes(field)]
+        return n, cols, True
+
+    for a, (field, default) in NUMERIC_ATTRS.items():
+        cols[a] = [_as_int(p.get(field, default), default) for p in patients]
+    for a, (field, default) in TEXT_ATTRS.items():
+        cols[a] = [str(p.get(field, default)).strip().lower() for p in patients]
+    return n, cols, False
+
+
+def assign_priority_batch(patients):
+    """
+    Priority for a whole PatientStore or list of patient dicts at once, from the same
+    RULES table. With NumPy every check is a column-wise mask; returns an int array.
+    """
+    n, cols, raw_numbers = _columns(patients)
+
+    if np is not None:
+        data = {}
+        for a, (_, default) in NUMERIC_ATTRS.items():
+            data[a] = _np_int_column(cols[a], default) if raw_numbers else np.asarray(cols[a], dtype=float)
+        for a, (_, default) in TEXT_ATTRS.items():
+            data[a] = np.asarray(cols[a], dtype=object)
+
+        result = np.full(n, DEFAULT_PRIORITY, dtype=np.int8)
+        done = np.zeros(n, dtype=bool)
+        for priority, clauses in RULES:
+            level = np.zeros(n, dtype=bool)
+            for clause in clauses:
+                mask = np.ones(n, dtype=bool)
+                for a, op, v in clause:
+                    if op == "in":
+                        mask &= np.isin(data[a], list(v))
+                    else:
+                        mask &= _OPS[op](data[a], v)
+                level |= mask
+            result[level & ~done] = priority
+            done |= level
+        return result
+
+    if raw_numbers:
+        for a, (_, default) in NUMERIC_ATTRS.items():
+            cols[a] = [int(x) if math.isfinite(x) else default for x in cols[a]]
+    result = array("b", [DEFAULT_PRIORITY]) * n
+    names = list(cols)
+    for i, values in enumerate(zip(*(cols[a] for a in names))):
+        attrs = dict(zip(names, values))
+        for priority, clauses in RULES:
+            if _matches(clauses, attrs):
+                result[i] = priority
+                break
+    return result
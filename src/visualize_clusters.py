@@ -1,18 +1,21 @@
 # K-Means cluster plot (persistent version)
 import os
-import matplotlib.pyplot as plt
-from .statistics_visuals import clear_old_plots, REPORT_DIR
+from .statistics_visuals import clear_old_plots, REPORT_DIR, _plt
+from .kmeans import group_by_label, np
 
-def plot_clusters(clusters, centroids, current_patient_count=None):
-    """Visualize clusters with persistence."""
-    clear_old_plots("cluster_plot", current_patient_count)
 
+def draw_clusters(clusters, centroids):
+    """Build the cluster figure without saving or showing it."""
+    plt = _plt()
     colors = ["#FF5733", "#33C1FF", "#75FF33", "#FF33A8", "#FFD433"]
-    plt.figure(figsize=(7, 5))
+    fig = plt.figure(figsize=(7, 5))
 
     for i, cluster in enumerate(clusters):
-        xs = [p[0] for p in cluster]
-        ys = [p[1] for p in cluster]
+        if hasattr(cluster, "shape"):  # (m, 2) NumPy block
+            xs, ys = cluster[:, 0], cluster[:, 1]
+        else:
+            xs = [p[0] for p in cluster]
+            ys = [p[1] for p in cluster]
         plt.scatter(xs, ys, color=colors[i % len(colors)], label=f"Cluster {i+1}")
 
     for i, c in enumerate(centroids):
@@ -24,10 +27,36 @@ def plot_clusters(clusters, centroids, current_patient_count=None):
     plt.legend()
     plt.grid(True)
     plt.tight_layout()
+    return fig
+
+
+def _split_by_label(points, labels, k):
+    if np is not None and hasattr(points, "shape"):
+        labels = np.asarray(labels)
+        return [points[labels == j] for j in range(k)]
+    return group_by_label(points, labels, k)
+
+
+def draw_labeled_clusters(points, labels, centroids):
+    """draw_clusters for the (points, labels) output of kmeans_fit (arrays stay arrays)."""
+    return draw_clusters(_split_by_label(points, labels, len(centroids)), centroids)
+
+
+def plot_labeled_clusters(points, labels, centroids, current_patient_count=None):
+    """Same plot, for the (points, labels) output of kmeans_fit."""
+    plot_clusters(_split_by_label(points, labels, len(centroids)), centroids, current_patient_count)
+
+
+def plot_clusters(clusters, centroids, current_patient_count=None):
+    """Visualize clusters with persistence."""
+    plt = _plt()
+    clear_old_plots("cluster_plot", current_patient_count)
+
+    fig = draw_clusters(clusters, centroids)
 
     out_path = os.path.join(REPORT_DIR, "cluster_plot.png")
     plt.savefig(out_path)
     plt.show()
-    plt.close()
+    plt.close(fig)
 
     print(f"Cluster plot saved to: {out_path}")
@@ -0,0 +1,5 @@
+# lets the tests import src / benchmarks when pytest is run from anywhere
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,68 @@
+# drives the admission service over TCP the way the triage desks do.
+import asyncio
+import json
+
+from src.admission_journal import AdmissionJournal
+from src.admission_service import AdmissionService, AdmissionClient
+
+PATIENTS = [
+    {"Name": "ana", "Age": 34, "Heart_Rate": 80, "Blood_Pressure": 120, "Oxygen_Level": 98,
+     "Consciousness": "Conscious", "Injury_Type": "minor"},
+    {"Name": "ben", "Age": 61, "Heart_Rate": 95, "Blood_Pressure": 70, "Oxygen_Level": 91,
+     "Consciousness": "Unconscious", "Injury_Type": "bleeding"},
+    {"Name": "cem", "Age": 45, "Heart_Rate": 130, "Blood_Pressure": 110, "Oxygen_Level": 95,
+     "Consciousness": "Conscious", "Injury_Type": "fracture"},
+    {"Name": "dia", "Age": 22, "Heart_Rate": 70, "Blood_Pressure": 118, "Oxygen_Level": 99,
+     "Consciousness": "Conscious", "Injury_Type": "none"},
+]
+
+
+async def _session(tmp_path):
+    service = AdmissionService([], journal=AdmissionJournal(str(tmp_path / "admissions.journal")))
+    await service.start(port=0)
+    desks = [await AdmissionClient(port=service.port).connect() for _ in range(2)]
+    try:
+        # two desks admitting at the same time, each one request after the other
+        async def desk(client, patients):
+            return [await client.admit(p) for p in patients]
+
+        first, second = await asyncio.gather(desk(desks[0], PATIENTS[0::2]), desk(desks[1], PATIENTS[1::2]))
+        replies = [r for pair in zip(first, second) for r in pair]
+        queue = await desks[0].next_patients(10)
+        stats = await desks[1].stats()
+
+        # a broken line is answered and the connection stays usable
+        reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+        writer.write(b"{not json\n")
+        writer.write(b'{"op": "queue", "n": null}\n')
+        writer.write(b'{"op": "ping"}\n')
+        await writer.drain()
+        errors = [json.loads(await reader.readline()) for _ in range(3)]
+        writer.close()
+        await writer.wait_closed()
+    finally:
+        for d in desks:
+            await d.close()
+        await service.stop()
+        service.journal.close()
+    return replies, queue, stats, errors
+
+
+def test_concurrent_admissions(tmp_path):
+    replies, queue, stats, errors = asyncio.run(_session(tmp_path))
+
+    assert all(r["ok"] for r in replies)
+    assert len({r["id"] for r in replies}) == len(PATIENTS)
+    assert [r["priority"] for r in replies] == [3, 1, 2, 4]
+
+    assert queue["ok"] and queue["size"] == len(PATIENTS)
+    assert [p["Name"] for p in queue["patients"]] == ["Ben", "Cem", "Ana", "Dia"]
+
+    assert stats["ok"] and stats["count"] == len(PATIENTS)
+    assert sum(stats["priority"].values()) == len(PATIENTS)
+
+    assert errors[0]["ok"] is False and errors[1]["ok"] is False
+    assert errors[2] == {"ok": True}
+
+    with open(tmp_path / "admissions.journal", encoding="utf-8") as f:
+        assert sum(1 for line in f if line.strip()) == len(PATIENTS)
@@ -0,0 +1,7 @@
+# start-up budget of the dashboard: "import main" must stay fast and must not pull in
+# the lazily loaded modules (see benchmarks/import_time.py).
+from benchmarks import import_time
+
+
+def test_import_main_within_budget():
+    assert import_time.main(["--repeat", "3"]) == 0